@@ -1,7 +1,14 @@
-from graph import Graph
+from heapq import heappop, heappush
+
+import numpy as np
+
+from . import functions
+from .engine import FusedLayers, SparseEngine
+from .graph import Graph
+from .stats import phase
 
 class ANN(Graph):
-    def __init__(self, matrix, func):
+    def __init__(self, matrix, func, backend='list'):
         """
         Initialise an ANN object. Default behaviour is initialise an empty
         Graph.
@@ -10,12 +17,17 @@ class ANN(Graph):
         ---------
         matrix : list
           2d matrix formed by nested lists.
-        directed : bool
-          Boolean to change enforce symmetry of edge matrix for undirected
-          graphs.
+        func : function
+          Activation function, given the list of weighted inputs to a vertex.
+        backend : str
+          How to store the matrix: 'list', 'dense' or 'sparse'. See Graph.
         """
+        self.backend = backend
         self.matrix = matrix
         self.func = func
+        self.inputs = {}
+        self.values = None
+        self._values_plan = None
         # Check matrix is square
         # assert(isinstance(self.matrix, list))
         # for row in self.matrix:
@@ -23,10 +35,83 @@ class ANN(Graph):
             # assert(isinstance(row, list))
         #    self.inputs={s:0 for s in self.sources()}
 
+    @property
+    def func(self):
+        return self._func
+
+    @func.setter
+    def func(self, func):
+        # func is given the list of weighted inputs to a vertex, so it is
+        # looked up as a reduction.
+        self._func = func
+        self.activation = functions.get(func, reduction=True)
+        # Activations computed with the old func are stale.
+        self.values = None
+
+    @property
+    def inputs(self):
+        return self._inputs
+
+    @inputs.setter
+    def inputs(self, inputs):
+        # Activations computed from the old inputs are stale.
+        self._inputs = inputs
+        self.values = None
+
+    def plan(self):
+        """
+        Return the evaluation plan of the network: a list of (V, heads, sink)
+        tuples in topological order, where heads is a tuple of (v, cost) pairs
+        for the edges into V and sink flags the output vertices. The plan is
+        cached until the matrix changes.
+
+        Returns
+        -------
+        plan : list
+        """
+        if not self._cached('plan'):
+            index = self.index()
+            sinks = set(index.sinks)
+            self._cache['plan'] = [
+                (V, tuple(zip(index.heads.neighbours(V).tolist(),
+                              index.heads.weights(V).tolist())),
+                 V in sinks)
+                for V in self.topological_order()]
+        return self._cache['plan']
+
+    def propagate(self, inputs):
+        """
+        Evaluate every vertex exactly once, in the order given by the plan.
+
+        Arguments
+        ---------
+        inputs : dict
+          Mapping of source vertex index to input value.
+
+        Returns
+        -------
+        values : dict
+          Mapping of vertex index to activation.
+        """
+        values = {}
+        func = self.activation.reduce
+        for V, heads, sink in self.plan():
+            # Base case
+            if not heads:
+                values[V] = inputs[V]
+            elif sink:
+                assert(len(heads)==1)
+                v, c = heads[0]
+                values[V] = c*values[v]
+            else:
+                values[V] = func([c*values[v] for v, c in heads])
+        return values
+
     def activate(self, V):
         """
-        Activate a vertex with index V by recursively calling activate on
-        vertices preceding V.
+        Activate a vertex with index V for the current inputs. The whole
+        network is evaluated once per set of inputs and later calls look the
+        activation up, until the inputs, matrix or func change.
 
         Arguments
         ---------
@@ -37,28 +122,216 @@ class ANN(Graph):
         -------
         output : float
         """
-        # Base case
-        if V in self.sources():    # in self.inputs
-            return self.inputs[V]
-        # Recursion case
-        elif V in self.sinks():
-            heads=self.heads(V)
-            assert(len(heads)==1)
-            v=heads[0]
-            return self.cost(v,V)*self.activate(v)
-        else:
-            inputs = []
-            for v in self.heads(V):
-                inputs.append(self.cost(v,V)*self.activate(v))
-            return self.func(inputs)
+        plan = self.plan()
+        if self.values is None or self._values_plan is not plan:
+            self.values = self.propagate(self.inputs)
+            self._values_plan = plan
+        return self.values[V]
+
+    def _count(self, samples):
+        # Record the evaluations made by feeding samples through the network.
+        index = self.index()
+        self.stats.samples += samples
+        self.stats.vertex_evaluations += samples*(self.order() - len(index.sources))
+        self.stats.edge_multiplications += samples*len(index.tails.indices)
 
     def feedforward(self, vals):
-        self.inputs={V:val for V, val in zip(self.sources(), vals)}
-        outputs={}    # make decision regarding returning dictionaries vs list,
-                      # refrring via indexes or vertices, etc.
-        for V in self.sinks():
-            outputs[V]=self.activate(V)
+        stats = self.stats
+        with phase(stats, 'feedforward.plan'):
+            self.plan()
+        with phase(stats, 'feedforward.inputs'):
+            self.inputs={V:val for V, val in zip(self.sources(), vals)}
+        with phase(stats, 'feedforward.propagate'):
+            self.values=self.propagate(self.inputs)
+            self._values_plan=self.plan()
+        with phase(stats, 'feedforward.outputs'):
+            outputs={}    # make decision regarding returning dictionaries vs list,
+                          # refrring via indexes or vertices, etc.
+            for V in self.sinks():
+                outputs[V]=self.values[V]
+        if stats is not None:
+            self._count(1)
         return outputs
 
+    def update(self, vals):
+        """
+        Feed new inputs through the network incrementally. The activations of
+        the previous feedforward or update are kept, and only vertices
+        downstream of sources whose input changed are re-evaluated, in
+        topological order, stopping wherever an activation is unchanged.
+        Falls back to feedforward when there are no previous activations or
+        the matrix or func has changed since.
+
+        Arguments
+        ---------
+        vals : list
+          Input values, in the order of sources(), one per source.
+
+        Returns
+        -------
+        outputs : dict
+          Mapping of sink vertex index to output, as for feedforward.
+        """
+        sources = self.sources()
+        if len(vals) != len(sources):
+            raise ValueError("Expected {} input values, got {}.".format(
+                len(sources), len(vals)))
+        plan = self.plan()
+        if self.values is None or self._values_plan is not plan:
+            return self.feedforward(vals)
+        if not self._cached('positions'):
+            self._cache['positions'] = {V: i for i, (V, _, _) in enumerate(plan)}
+        position = self._cache['positions']
+        tails = self.index().tails
+        func = self.activation.reduce
+        values = self.values
+        heap = []
+        queued = set()
+        def push(V):
+            for v in tails.neighbours(V).tolist():
+                if v not in queued:
+                    queued.add(v)
+                    heappush(heap, position[v])
+        for V, val in zip(sources, vals):
+            if values[V] != val:
+                values[V] = self.inputs[V] = val
+                push(V)
+        # Every head of a vertex comes before it in the plan, so a vertex is
+        # only evaluated once all of its changed heads have been.
+        evaluated = 0
+        edges = 0
+        while heap:
+            V, heads, sink = plan[heappop(heap)]
+            if sink:
+                v, c = heads[0]
+                value = c*values[v]
+            else:
+                value = func([c*values[v] for v, c in heads])
+            evaluated += 1
+            edges += len(heads)
+            if value != values[V]:
+                values[V] = value
+                push(V)
+        if self.stats is not None:
+            self.stats.samples += 1
+            self.stats.vertex_evaluations += evaluated
+            self.stats.edge_multiplications += edges
+        return {V: values[V] for V in self.sinks()}
+
+    def batch_plan(self):
+        """
+        Return the level by level evaluation plan used by feedforward_batch: a
+        list of (vertices, heads, weights, sink) tuples, one per level after
+        the sources. weights is a dense (len(heads), len(vertices)) block of
+        edge costs and sink a boolean mask over vertices. Cached until the
+        matrix changes.
+
+        Returns
+        -------
+        plan : list
+        """
+        if not self._cached('batch_plan'):
+            index = self.index()
+            sinks = set(index.sinks)
+            plan = []
+            for level in self.levels()[1:]:
+                heads = sorted({v for V in level
+                                for v in index.heads.neighbours(V).tolist()})
+                rows = {v: i for i, v in enumerate(heads)}
+                weights = np.zeros((len(heads), len(level)))
+                for j, V in enumerate(level):
+                    if V in sinks:
+                        assert(index.heads.degrees()[V]==1)
+                    for v, c in zip(index.heads.neighbours(V).tolist(),
+                                    index.heads.weights(V).tolist()):
+                        weights[rows[v], j] = c
+                plan.append((np.array(level), np.array(heads), weights,
+                             np.array([V in sinks for V in level])))
+            self._cache['batch_plan'] = plan
+        return self._cache['batch_plan']
+
+    def engine(self):
+        """
+        Return a SparseEngine for the network, which runs feedforward as
+        sparse matrix products. Cached until the matrix changes.
+
+        Returns
+        -------
+        engine : SparseEngine
+        """
+        if not self._cached('engine'):
+            self._cache['engine'] = SparseEngine(self)
+        return self._cache['engine']
+
+    def fused(self):
+        """
+        Return a FusedLayers engine if the network is strictly layered and
+        fully connected between layers, or None otherwise. Cached until the
+        matrix changes.
+        """
+        if not self._cached('fused'):
+            self._cache['fused'] = FusedLayers.lower(self)
+        return self._cache['fused']
+
+    def feedforward_batch(self, X, chunk_size=4096):
+        """
+        Feed a batch of inputs through the network, one level at a time, with
+        array operations over the whole batch. Strictly layered networks take
+        the fused path of fused() instead. A func without an array form, see
+        ann.functions.array_form, is applied sample by sample with propagate.
+
+        Arguments
+        ---------
+        X : numpy.array
+          A two dimensional array with one row of source values per sample.
+        chunk_size : int
+          Number of samples evaluated together, bounding the working memory to
+          chunk_size*order activations.
+
+        Returns
+        -------
+        outputs : numpy.array
+          A (n_samples, n_sinks) array, with columns in the order of sinks().
+        """
+        X = np.asarray(X, dtype=np.float64)
+        assert(X.ndim==2 and X.shape[1]==len(self.sources()))
+        stats = self.stats
+        sources = list(self.sources())
+        sinks = list(self.sinks())
+        if self.activation.array is None:
+            out = np.empty((X.shape[0], len(sinks)))
+            with phase(stats, 'feedforward_batch.propagate'):
+                for i, row in enumerate(X.tolist()):
+                    values = self.propagate(dict(zip(sources, row)))
+                    out[i] = [values[V] for V in sinks]
+            if stats is not None:
+                self._count(X.shape[0])
+            return out
+        with phase(stats, 'feedforward_batch.plan'):
+            fused = self.fused()
+        if fused is not None:
+            with phase(stats, 'feedforward_batch.propagate'):
+                out = fused.feedforward_batch(X, chunk_size)
+            if stats is not None:
+                self._count(X.shape[0])
+            return out
+        with phase(stats, 'feedforward_batch.plan'):
+            plan = self.batch_plan()
+        func = self.activation.array
+        out = np.empty((X.shape[0], len(sinks)))
+        for start in range(0, X.shape[0], chunk_size):
+            stop = min(start + chunk_size, X.shape[0])
+            values = np.empty((stop - start, self.order()))
+            values[:, sources] = X[start:stop]
+            with phase(stats, 'feedforward_batch.propagate'):
+                for vertices, heads, weights, sink in plan:
+                    z = values[:, heads] @ weights
+                    z[:, ~sink] = func(z[:, ~sink])
+                    values[:, vertices] = z
+            out[start:stop] = values[:, sinks]
+        if stats is not None:
+            self._count(X.shape[0])
+        return out
+
 # Concerns: What should I be returning? Be aware of ordering - I am referring
 # to vertices by indexes, but also by labels. Is that a problem?
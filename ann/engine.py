@@ -0,0 +1,165 @@
+import numpy as np
+
+from .functions import array_form
+from .graph import CSR
+
+class SparseEngine:
+    """
+    Feedforward engine which lowers an ANN into one sparse weight matrix per
+    topological level. Evaluating a level is a sparse product of the
+    activations computed so far with that level's matrix, so the cost of a
+    forward pass scales with the number of edges rather than with the square
+    of the number of vertices. The ANN's func must have an array form, see
+    ann.functions.array_form.
+    """
+
+    def __init__(self, ann):
+        """
+        Arguments
+        ---------
+        ann : ANN
+          The network to lower. The engine reflects the matrix at the time it
+          is created; ANN.engine() returns one kept up to date.
+        """
+        self.ann = ann
+        index = ann.index()
+        self.order = ann.order()
+        self.sources = np.array(ann.sources(), dtype=np.int64)
+        self.sinks = np.array(ann.sinks(), dtype=np.int64)
+        heads = index.heads
+        sinks = set(index.sinks)
+        self.levels = []
+        for level in ann.levels()[1:]:
+            level = np.array(level, dtype=np.int64)
+            indptr = np.zeros(len(level) + 1, dtype=np.int64)
+            np.cumsum(heads.degrees()[level], out=indptr[1:])
+            indices = np.concatenate([heads.neighbours(V) for V in level])
+            data = np.concatenate([heads.weights(V) for V in level])
+            sink = np.array([V in sinks for V in level])
+            assert(np.all(heads.degrees()[level[sink]]==1))
+            # Rows are the level's vertices and columns all vertices.
+            self.levels.append((level, CSR(indptr, indices, data), sink))
+
+    def _propagate(self, values):
+        func = array_form(self.ann.activation)
+        for level, weights, sink in self.levels:
+            z = weights.dot(values)
+            z[..., ~sink] = func(z[..., ~sink])
+            values[..., level] = z
+        return values
+
+    def feedforward(self, vals):
+        """
+        Feed a single input through the network with sparse matrix-vector
+        products, returning a dict of sink vertex index to output like
+        ANN.feedforward.
+        """
+        values = np.zeros(self.order)
+        values[self.sources] = vals
+        values = self._propagate(values)
+        return dict(zip(self.sinks.tolist(), values[self.sinks].tolist()))
+
+    def feedforward_batch(self, X, chunk_size=1024):
+        """
+        Feed a batch of inputs through the network with sparse matrix-matrix
+        products.
+
+        Arguments
+        ---------
+        X : numpy.array
+          A two dimensional array with one row of source values per sample.
+        chunk_size : int
+          Number of samples evaluated together. Working memory is about
+          chunk_size*(order + edges in the largest level) floats.
+
+        Returns
+        -------
+        outputs : numpy.array
+          A (n_samples, n_sinks) array, with columns in the order of sinks().
+        """
+        X = np.asarray(X, dtype=np.float64)
+        assert(X.ndim==2 and X.shape[1]==len(self.sources))
+        out = np.empty((X.shape[0], len(self.sinks)))
+        for start in range(0, X.shape[0], chunk_size):
+            stop = min(start + chunk_size, X.shape[0])
+            values = np.zeros((stop - start, self.order))
+            values[:, self.sources] = X[start:stop]
+            out[start:stop] = self._propagate(values)[:, self.sinks]
+        return out
+
+class FusedLayers:
+    """
+    Feedforward engine for strictly layered ANNs: every vertex of a level
+    has all of the previous level as its heads and nothing else, except for
+    the last level, whose sinks each have one head in the level before. The
+    network is then a chain of dense weight matrices, and a batch runs as
+    chained matrix products with the activation applied in place, into
+    buffers kept between calls. The buffers make an engine unsafe to share
+    between threads.
+    """
+
+    def __init__(self, ann, weights, outputs, scales):
+        """
+        Arguments
+        ---------
+        ann : ANN
+          The network, used for its activation function.
+        weights : list
+          Dense (n_previous, n_level) weight matrix of each hidden level.
+        outputs : numpy.array
+          Position in the last hidden level of the head of each sink.
+        scales : numpy.array
+          Weight on the edge into each sink.
+        """
+        self.ann = ann
+        self.weights = weights
+        self.outputs = outputs
+        self.scales = scales
+        self._buffers = []
+
+    @classmethod
+    def lower(cls, ann):
+        """
+        Return a FusedLayers for ann, or None if it is not strictly layered.
+        """
+        levels = ann.levels()
+        index = ann.index()
+        sinks = set(index.sinks)
+        if len(levels) < 2 or any(V in sinks for V in levels[0]):
+            return None
+        weights = []
+        for previous, level in zip(levels, levels[1:-1]):
+            W = np.empty((len(previous), len(level)))
+            for j, V in enumerate(level):
+                if (V in sinks or
+                        not np.array_equal(index.heads.neighbours(V), previous)):
+                    return None
+                W[:, j] = index.heads.weights(V)
+            weights.append(W)
+        position = {V: i for i, V in enumerate(levels[-2])}
+        if any(index.heads.degrees()[V] != 1 for V in levels[-1]):
+            return None
+        outputs = np.array([position[index.heads.neighbours(V)[0]]
+                            for V in levels[-1]], dtype=np.int64)
+        scales = np.concatenate([index.heads.weights(V) for V in levels[-1]])
+        return cls(ann, weights, outputs, scales)
+
+    def feedforward_batch(self, X, chunk_size=4096):
+        """
+        Feed a batch of inputs through the network, as ANN.feedforward_batch.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        func = array_form(self.ann.activation)
+        rows = min(chunk_size, len(X))
+        if not self._buffers or len(self._buffers[0]) < rows:
+            self._buffers = [np.empty((rows, W.shape[1])) for W in self.weights]
+        out = np.empty((len(X), len(self.outputs)))
+        for start in range(0, len(X), chunk_size):
+            stop = min(start + chunk_size, len(X))
+            values = X[start:stop]
+            for W, buffer in zip(self.weights, self._buffers):
+                z = buffer[:stop - start]
+                np.matmul(values, W, out=z)
+                values = func(z, out=z)
+            np.multiply(values[:, self.outputs], self.scales, out=out[start:stop])
+        return out
@@ -1,5 +1,149 @@
+import math
 from math import fsum
 
+import numpy as np
+
+class Activation:
+    """
+    An activation function in the forms its different call sites need:
+     * scalar(x) for a single weighted sum, as used by Perceptron and Network.
+     * reduce(xs) for an iterable of weighted inputs, as used by ANN.
+     * array(z, out=None) elementwise over a numpy array of weighted sums, as
+       used by the batched paths. If out is given the result is written into
+       it and returned. None for a reduction which needs the weighted inputs
+       themselves rather than their sum, see array_form.
+    """
+
+    def __init__(self, name, scalar, array=None, reduce=None, vectorize=True):
+        """
+        Arguments
+        ---------
+        name : str
+          Name in the registry, or None for an unregistered function.
+        scalar : function
+          Activation of a single weighted sum.
+        array : function
+          Elementwise activation of an array. Defaults to vectorizing scalar.
+        reduce : function
+          Activation of an iterable of weighted inputs. Defaults to scalar
+          applied to their sum.
+        vectorize : bool
+          Whether to vectorize scalar when array is not given. If False the
+          activation has no array form and array is None.
+        """
+        self.name = name
+        self.scalar = scalar
+        if array is None and vectorize:
+            array = _vectorize(scalar)
+        self.array = array
+        self.reduce = reduce or (lambda xs: scalar(fsum(xs)))
+
+    def __repr__(self):
+        return "Activation({!r})".format(self.name)
+
+def _vectorize(scalar):
+    func = np.vectorize(scalar, otypes=[np.float64])
+    def array(z, out=None):
+        if out is None:
+            return func(z)
+        out[...] = func(z)
+        return out
+    return array
+
 def heaviside(x):
-    return 1 if fsum(x) > 0 else 0
+    """
+    Return 1 if x, or the sum of x if it is iterable, is positive, else 0.
+    """
+    try:
+        x = fsum(x)
+    except TypeError:
+        pass
+    return 1 if x > 0 else 0
+
+def _heaviside_array(z, out=None):
+    if out is None:
+        return (z > 0).astype(np.float64)
+    return np.greater(z, 0, out=out)
+
+def identity(x):
+    return x
+
+def _identity_array(z, out=None):
+    if out is None:
+        return z
+    out[...] = z
+    return out
+
+def sigmoid(x):
+    # Written in terms of tanh, which cannot overflow.
+    return 0.5*(1 + math.tanh(0.5*x))
+
+def _sigmoid_array(z, out=None):
+    out = np.multiply(z, 0.5, out=out)
+    np.tanh(out, out=out)
+    out += 1
+    out *= 0.5
+    return out
+
+def tanh(x):
+    return math.tanh(x)
+
+def _tanh_array(z, out=None):
+    return np.tanh(z, out=out)
+
+def relu(x):
+    return x if x > 0 else 0
+
+def _relu_array(z, out=None):
+    return np.maximum(z, 0, out=out)
+
+ACTIVATIONS = {a.name: a for a in [
+    Activation('heaviside', heaviside, _heaviside_array),
+    Activation('identity', identity, _identity_array),
+    Activation('sigmoid', sigmoid, _sigmoid_array),
+    Activation('tanh', tanh, _tanh_array),
+    Activation('relu', relu, _relu_array)]}
+
+def array_form(activation):
+    """
+    Return activation.array, or raise a ValueError if the activation has no
+    array form, as for an unregistered ANN func.
+    """
+    if activation.array is None:
+        raise ValueError("The batched paths need an activation acting on "
+                         "weighted sums; register func in ann.functions.")
+    return activation.array
+
+def get(func, reduction=False):
+    """
+    Return the Activation for func, which may be an Activation, the name of a
+    registered one or its scalar function. The builtin sum means the identity
+    applied to the summed inputs. Any other callable is wrapped without being
+    registered; it is taken to act on a single weighted sum, or on the list
+    of weighted inputs if reduction is True. Such a reduction, eg. max, need
+    not depend on the sum alone, so it gets no array form.
+
+    Arguments
+    ---------
+    func : function, str or Activation
+    reduction : bool
+      Whether an unregistered func takes a list of weighted inputs, as for
+      ANN, rather than their sum, as for Perceptron and Network.
 
+    Returns
+    -------
+    activation : Activation
+    """
+    if isinstance(func, Activation):
+        return func
+    if isinstance(func, str):
+        return ACTIVATIONS[func]
+    if func is sum or func is fsum:
+        return ACTIVATIONS['identity']
+    for activation in ACTIVATIONS.values():
+        if func is activation.scalar:
+            return activation
+    if reduction:
+        return Activation(None, lambda x: func([x]), reduce=func,
+                          vectorize=False)
+    return Activation(None, func)
@@ -1,9 +1,234 @@
+import csv
+import os
+from array import array
+from collections import deque, namedtuple
+
+import numpy as np
+
+class CSR:
+    """
+    Compressed sparse row representation of the edges of a graph. The
+    neighbours of vertex V are indices[indptr[V]:indptr[V+1]], in ascending
+    order, and data holds the weights on those edges.
+    """
+
+    def __init__(self, indptr, indices, data):
+        """
+        Arguments
+        ---------
+        indptr : numpy.array
+          Row offsets into indices and data, of length order + 1.
+        indices : numpy.array
+          Column (neighbour) index of every edge.
+        data : numpy.array
+          Weight of every edge.
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """
+        Build a CSR from a 2d matrix formed by nested lists, where None means
+        there is no edge.
+        """
+        indptr = [0]
+        indices = []
+        data = []
+        for row in matrix:
+            for j, c in enumerate(row):
+                if c is not None:
+                    indices.append(j)
+                    data.append(c)
+            indptr.append(len(indices))
+        return cls(np.array(indptr, dtype=np.int64),
+                   np.array(indices, dtype=np.int64),
+                   np.array(data, dtype=np.float64))
+
+    @classmethod
+    def from_arrays(cls, heads, tails, weights, order=None):
+        """
+        Build a CSR from parallel arrays of edge heads, tails and weights, in
+        any order. order defaults to one more than the largest vertex index.
+
+        Raises
+        ------
+        ValueError
+          If an edge appears more than once, or a vertex index is negative or
+          not less than order.
+        """
+        heads = np.asarray(heads, dtype=np.int64)
+        tails = np.asarray(tails, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        if order is None:
+            order = int(max(heads.max(initial=-1), tails.max(initial=-1))) + 1
+        for name, vertices in (('head', heads), ('tail', tails)):
+            bad = (vertices < 0) | (vertices >= order)
+            if bad.any():
+                raise ValueError("Edge {} {} out of range for {} vertices.".format(
+                    name, int(vertices[bad][0]), order))
+        perm = np.lexsort((tails, heads))
+        heads, tails = heads[perm], tails[perm]
+        if np.any((heads[1:] == heads[:-1]) & (tails[1:] == tails[:-1])):
+            raise ValueError("Duplicate edge.")
+        indptr = np.zeros(order + 1, dtype=np.int64)
+        np.cumsum(np.bincount(heads, minlength=order), out=indptr[1:])
+        return cls(indptr, tails, weights[perm])
+
+    @classmethod
+    def from_edges(cls, edges, order=None):
+        """
+        Build a CSR from an iterable of (head, tail, weight) triples, which is
+        consumed once and never held as Python objects.
+        """
+        heads = array('q')
+        tails = array('q')
+        weights = array('d')
+        for head, tail, weight in edges:
+            heads.append(head)
+            tails.append(tail)
+            weights.append(weight)
+        return cls.from_arrays(np.frombuffer(heads, dtype=np.int64),
+                               np.frombuffer(tails, dtype=np.int64),
+                               np.frombuffer(weights, dtype=np.float64), order)
+
+    @classmethod
+    def from_mask(cls, mask, weights):
+        """
+        Build a CSR from a square boolean edge mask and an array of weights.
+        """
+        rows, cols = np.nonzero(mask)
+        indptr = np.zeros(mask.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=mask.shape[0]), out=indptr[1:])
+        return cls(indptr, cols.astype(np.int64),
+                   weights[rows, cols].astype(np.float64))
+
+    def order(self):
+        return len(self.indptr) - 1
+
+    def to_matrix(self):
+        """
+        Return the 2d matrix formed by nested lists, with None for no edge.
+        """
+        n = self.order()
+        matrix = [[None]*n for _ in range(n)]
+        for V in range(n):
+            for v, c in zip(self.neighbours(V).tolist(), self.weights(V).tolist()):
+                matrix[V][v] = c
+        return matrix
+
+    def find(self, V1, V2):
+        """
+        Return the position in indices and data of the edge from V1 to V2, or
+        None if there is no such edge.
+        """
+        start, stop = self.indptr[V1], self.indptr[V1+1]
+        i = start + np.searchsorted(self.indices[start:stop], V2)
+        return i if i < stop and self.indices[i] == V2 else None
+
+    def with_cost(self, V1, V2, cost):
+        """
+        Return a CSR with the weight of the edge from V1 to V2 set to cost,
+        adding the edge if needed, or removing it if cost is None. Reweighting
+        an existing edge is done in place; otherwise the arrays are copied.
+        """
+        i = self.find(V1, V2)
+        if i is not None and cost is not None:
+            self.data[i] = cost
+            return self
+        indptr = self.indptr.copy()
+        if i is not None:
+            indptr[V1+1:] -= 1
+            return CSR(indptr, np.delete(self.indices, i),
+                       np.delete(self.data, i))
+        if cost is None:
+            return self
+        start, stop = self.indptr[V1], self.indptr[V1+1]
+        i = start + np.searchsorted(self.indices[start:stop], V2)
+        indptr[V1+1:] += 1
+        return CSR(indptr, np.insert(self.indices, i, V2),
+                   np.insert(self.data, i, cost))
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def neighbours(self, V):
+        return self.indices[self.indptr[V]:self.indptr[V+1]]
+
+    def weights(self, V):
+        return self.data[self.indptr[V]:self.indptr[V+1]]
+
+    def dot(self, x):
+        """
+        Multiply x by the transpose of this matrix, ie. for each row sum the
+        entries of x in its columns weighted by its data. x is a vector, or a
+        two dimensional array of such vectors as rows, indexed by column.
+        """
+        x = np.asarray(x)
+        out = np.zeros(x.shape[:-1] + (self.order(),))
+        nonempty = self.degrees() > 0
+        if nonempty.any():
+            out[..., nonempty] = np.add.reduceat(
+                x[..., self.indices] * self.data, self.indptr[:-1][nonempty],
+                axis=-1)
+        return out
+
+    def transpose(self):
+        """
+        Return the CSR of the reversed graph, ie. the column index of this one.
+        """
+        n = self.order()
+        rows = np.repeat(np.arange(n, dtype=np.int64), self.degrees())
+        # A stable sort keeps the new rows' neighbours in ascending order.
+        perm = np.argsort(self.indices, kind='stable')
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=n), out=indptr[1:])
+        return CSR(indptr, rows[perm], self.data[perm])
+
+# heads and tails are the predecessor and successor CSRs of a graph.
+Index = namedtuple('Index', ['heads', 'tails', 'sources', 'sinks'])
+
+# Record layout of binary edge list files read by Graph.from_file.
+EDGE_DTYPE = np.dtype([('head', '<i8'), ('tail', '<i8'), ('weight', '<f8')])
+
+class _ReadOnlyList(list):
+    """
+    A list which cannot be changed in place, used for the rows of the list
+    backend's matrix so that writing into it fails instead of leaving cached
+    structure stale. It compares equal to a list with the same items.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Graph matrices are read only; use Graph.set_cost or "
+                        "assign a new matrix.")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def _set(self, i, value):
+        list.__setitem__(self, i, value)
+
 class Graph:
     """
     Matrix representation of an edge weighted(, directed) graph.
+
+    The matrix can be stored in one of three backends:
+     * 'list': the nested lists themselves, with None for no edge.
+     * 'dense': a float64 numpy.array of weights with a boolean edge mask.
+     * 'sparse': a CSR of the edges, taking memory proportional to their
+       number.
+    The matrix property is read only with every backend: the list backend
+    keeps a copy of the matrix it is given, which raises a TypeError if
+    written into, and the compact backends build nested lists on demand.
+    Change edges with set_cost, or assign a whole new matrix; both clear the
+    structure cached from the matrix.
     """
 
-    def __init__(self, matrix=[[]]):
+    # Set to an ann.stats.Stats to collect statistics.
+    stats = None
+
+    def __init__(self, matrix=[[]], backend='list'):
         """
         Initialise a Graph object. Default behaviour is to initialise an empty
         Graph.
@@ -11,11 +236,12 @@ class Graph:
         Arguments
         ---------
         matrix : list
-          2d matrix formed by nested lists.
-        directed : bool
-          Boolean to change enforce symmetry of edge matrix for undirected
-          graphs.
+          2d matrix formed by nested lists, or a CSR, which the sparse backend
+          uses as is.
+        backend : str
+          How to store the matrix: 'list', 'dense' or 'sparse'.
         """
+        self.backend = backend
         self.matrix = matrix
         # Check matrix is square
         # assert(isinstance(self.matrix, list))
@@ -23,7 +249,109 @@ class Graph:
         #    assert(len(row) == self.order)
             # assert(isinstance(row, list))
 
+    @classmethod
+    def from_edges(cls, edges, order=None, backend='sparse', **kwargs):
+        """
+        Create a graph from an iterable of (head, tail, weight) triples,
+        without materialising the matrix: with the default sparse backend
+        time and memory are proportional to the number of edges. Other
+        arguments, such as func for an ANN, are passed to the constructor.
+
+        Arguments
+        ---------
+        edges : iterable
+          (head, tail, weight) triples of vertex indices and edge weight.
+        order : int
+          Number of vertices, by default one more than the largest index.
+        """
+        matrix = CSR.from_edges(edges, order)
+        return cls(matrix, backend=backend, **kwargs)
+
+    @classmethod
+    def from_network(cls, V, E, weights, backend='sparse', **kwargs):
+        """
+        Create a graph from the V, E and weights of a Network. Vertex i of the
+        graph is the i-th smallest label in V.
+        """
+        labels = {v: i for i, v in enumerate(sorted(V))}
+        edges = ((labels[e[0]], labels[e[1]], weights[e]) for e in E)
+        return cls.from_edges(edges, len(labels), backend, **kwargs)
+
+    @classmethod
+    def from_file(cls, path, format=None, order=None, backend='sparse', **kwargs):
+        """
+        Create a graph from an edge list file, streamed rather than read
+        whole. A 'csv' file has a head,tail,weight line per edge; blank lines
+        and lines starting with # are skipped. A 'binary' file is a sequence
+        of EDGE_DTYPE records, as written by numpy.ndarray.tofile, and is
+        memory mapped.
+
+        Arguments
+        ---------
+        path : str
+          Path of the file.
+        format : str
+          'csv' or 'binary', by default 'csv' for files ending in .csv and
+          'binary' otherwise.
+        order : int
+          Number of vertices, by default one more than the largest index.
+        """
+        if format is None:
+            format = 'csv' if str(path).endswith('.csv') else 'binary'
+        if format == 'csv':
+            with open(path, newline='') as f:
+                rows = (row for row in csv.reader(f)
+                        if row and not row[0].lstrip().startswith('#'))
+                matrix = CSR.from_edges(
+                    ((int(h), int(t), float(w)) for h, t, w in rows), order)
+        elif format == 'binary':
+            if os.path.getsize(path):
+                records = np.memmap(path, dtype=EDGE_DTYPE, mode='r')
+            else:
+                records = np.zeros(0, dtype=EDGE_DTYPE)
+            matrix = CSR.from_arrays(records['head'], records['tail'],
+                                     records['weight'], order)
+        else:
+            raise ValueError("Unknown edge list format: {}".format(format))
+        return cls(matrix, backend=backend, **kwargs)
+
+    @property
+    def matrix(self):
+        if self.backend == 'list':
+            return self._matrix
+        if self.backend == 'sparse':
+            rows = self._csr.to_matrix()
+        else:
+            n = self.order()
+            rows = ([self.cost(i, j) for j in range(n)] for i in range(n))
+        return _ReadOnlyList(_ReadOnlyList(row) for row in rows)
+
+    @matrix.setter
+    def matrix(self, matrix):
+        # Anything derived from the matrix is cached in self._cache, so it must
+        # be cleared whenever the matrix is replaced.
+        if isinstance(matrix, CSR) and self.backend != 'sparse':
+            matrix = matrix.to_matrix()
+        if self.backend == 'list':
+            self._matrix = _ReadOnlyList(_ReadOnlyList(row) for row in matrix)
+        elif self.backend == 'dense':
+            cells = np.array(matrix, dtype=object).reshape(len(matrix), -1)
+            self._mask = np.not_equal(cells, None)
+            self._weights = np.where(self._mask, cells, 0).astype(np.float64)
+        elif self.backend == 'sparse':
+            if isinstance(matrix, CSR):
+                self._csr = matrix
+            else:
+                self._csr = CSR.from_matrix(matrix)
+        else:
+            raise ValueError("Unknown backend: {}".format(self.backend))
+        self._cache = {}
+
     def order(self):
+        if self.backend == 'dense':
+            return self._mask.shape[0]
+        if self.backend == 'sparse':
+            return self._csr.order()
         return len(self.matrix)
 
     def cost(self, V1, V2):
@@ -43,8 +371,73 @@ class Graph:
         cost : float
           Weight on the edge between vertices indicated by V1 and V2.
         """
+        if self.backend == 'dense':
+            return float(self._weights[V1, V2]) if self._mask[V1, V2] else None
+        if self.backend == 'sparse':
+            i = self._csr.find(V1, V2)
+            return None if i is None else float(self._csr.data[i])
         return self.matrix[V1][V2]
 
+    def set_cost(self, V1, V2, cost):
+        """
+        Set the cost of the edge from V1 to V2, clearing any cached structure
+        derived from the matrix. A cost of None removes the edge.
+
+        Arguments
+        ---------
+        V1 : int
+          Vertex index for a vertex belonging to the Graph object.
+        V2 : int
+          Vertex index for a vertex belonging to the Graph object.
+        cost : float
+          New weight on the edge, or None.
+        """
+        if self.backend == 'dense':
+            self._mask[V1, V2] = cost is not None
+            self._weights[V1, V2] = 0 if cost is None else cost
+        elif self.backend == 'sparse':
+            self._csr = self._csr.with_cost(V1, V2, cost)
+        else:
+            self._matrix[V1]._set(V2, cost)
+        self._cache = {}
+
+    def _cached(self, key):
+        """
+        Return whether the structure called key is cached, counting the hit or
+        miss if statistics are being collected.
+        """
+        hit = key in self._cache
+        if self.stats is not None:
+            if hit:
+                self.stats.cache_hits += 1
+            else:
+                self.stats.cache_misses += 1
+        return hit
+
+    def index(self):
+        """
+        Return the adjacency index of the graph, built from the matrix on first
+        use and cached until the matrix changes. It holds predecessor (heads)
+        and successor (tails) CSRs plus the source and sink vertex indices.
+
+        Returns
+        -------
+        index : Index
+        """
+        if not self._cached('index'):
+            if self.backend == 'sparse':
+                tails = self._csr
+            elif self.backend == 'dense':
+                tails = CSR.from_mask(self._mask, self._weights)
+            else:
+                tails = CSR.from_matrix(self.matrix)
+            heads = tails.transpose()
+            self._cache['index'] = Index(
+                heads, tails,
+                tuple(np.flatnonzero(heads.degrees() == 0).tolist()),
+                tuple(np.flatnonzero(tails.degrees() == 0).tolist()))
+        return self._cache['index']
+
     def heads(self, V):
         """
         For a vertex index V, return the vertex indices for vertices which are
@@ -61,8 +454,9 @@ class Graph:
           list of vertex indices of the vertices at the heads of the edges
           connected to the vertex indicated by V.
         """
-        return [i for i in range(self.order()) if self.matrix[i][V] != None]
-    #replace [ ] with ( ) to create a generator: better practice, right?
+        if self.stats is not None:
+            self.stats.heads_calls += 1
+        return self.index().heads.neighbours(V).tolist()
 
     def tails(self, V):
         """
@@ -80,22 +474,84 @@ class Graph:
           list of vertex indices of the vertices at the heads of the edges
           connected to the vertex indicated by V.
         """
-        return [i for i in range(self.order()) if self.matrix[V][i] != None]
-    #replace [ ] with ( ) to create a generator: better practice, right?
+        if self.stats is not None:
+            self.stats.tails_calls += 1
+        return self.index().tails.neighbours(V).tolist()
 
     def sources(self):
         """
         Return the vertex indices for any vertex which is not at the tail of
         any edges in the graph.
         """
-        return (i for i in range(self.order()) if len(tuple(self.heads(i)))==0)
+        return self.index().sources
 
     def sinks(self ):
         """
         Return the vertex indices for any vertex which is not at the head of
         any edges in the graph.
         """
-        return (i for i in range(self.order()) if len(tuple(self.tails(i)))==0)
+        return self.index().sinks
+
+    def topological_order(self):
+        """
+        Return the vertex indices ordered so that every vertex comes after all
+        of its heads (Kahn's algorithm). The order is cached until the matrix
+        changes.
+
+        Returns
+        -------
+        vertices : list
+          list of all vertex indices in topological order.
+
+        Raises
+        ------
+        ValueError
+          If the graph contains a cycle.
+        """
+        if not self._cached('topological_order'):
+            index = self.index()
+            indegree = index.heads.degrees().tolist()
+            indptr = index.tails.indptr.tolist()
+            indices = index.tails.indices.tolist()
+            queue = deque(index.sources)
+            order = []
+            while queue:
+                V = queue.popleft()
+                order.append(V)
+                for v in indices[indptr[V]:indptr[V+1]]:
+                    indegree[v] -= 1
+                    if indegree[v] == 0:
+                        queue.append(v)
+            if len(order) != len(indegree):
+                raise ValueError("Graph contains a cycle.")
+            self._cache['topological_order'] = order
+        return self._cache['topological_order']
+
+    def levels(self):
+        """
+        Group the vertex indices by topological depth, the length of the
+        longest path reaching each vertex from a source. Vertices at the same
+        depth do not depend on each other, and every vertex depends only on
+        vertices in earlier levels. Cached until the matrix changes.
+
+        Returns
+        -------
+        levels : list
+          list of lists of vertex indices, starting with the sources.
+        """
+        if not self._cached('levels'):
+            tails = self.index().tails
+            indptr = tails.indptr.tolist()
+            indices = tails.indices.tolist()
+            depth = [0]*self.order()
+            for V in self.topological_order():
+                for v in indices[indptr[V]:indptr[V+1]]:
+                    depth[v] = max(depth[v], depth[V] + 1)
+            levels = [[] for _ in range(max(depth, default=-1) + 1)]
+            for V, d in enumerate(depth):
+                levels[d].append(V)
+            self._cache['levels'] = levels
+        return self._cache['levels']
 
 class UndirectedUnweightedCompleteGraph(Graph):
     def __init__(self, k):
@@ -1,6 +1,140 @@
+import os
+from collections import deque, namedtuple
+from itertools import chain, islice
+
+import time
+
+import numpy as np
+
 from . import functions
 
+def _chunks(data, chunk_size):
+    """
+    Yield two dimensional arrays of rows from data, which may be an array
+    (including a numpy.memmap), the path of a .npy file, which is memory
+    mapped rather than read, an iterable of two dimensional chunks of rows or
+    an iterable of rows, which are grouped chunk_size at a time.
+    """
+    if isinstance(data, (str, os.PathLike)):
+        data = np.load(data, mmap_mode='r')
+    if isinstance(data, np.ndarray):
+        for start in range(0, data.shape[0], chunk_size):
+            yield data[start:start+chunk_size]
+        return
+    items = iter(data)
+    first = next(items, None)
+    if first is None:
+        return
+    items = chain([first], items)
+    if np.ndim(first) == 1:
+        while True:
+            rows = list(islice(items, chunk_size))
+            if not rows:
+                return
+            yield np.asarray(rows)
+    for chunk in items:
+        yield np.asarray(chunk)
+
+def _batches(data, batch_size, chunk_size):
+    """
+    Split the rows streamed from data into mini-batches of batch_size rows,
+    whatever the chunk boundaries are. Yields the pieces of each batch in
+    turn, then None once the batch is complete. With batch_size None all of
+    the rows form one batch.
+    """
+    filled = 0
+    for chunk in _chunks(data, chunk_size):
+        while len(chunk):
+            piece = chunk if batch_size is None else chunk[:batch_size-filled]
+            chunk = chunk[len(piece):]
+            filled += len(piece)
+            yield piece
+            if filled == batch_size:
+                yield None
+                filled = 0
+    if filled:
+        yield None
+
+# Summary of a call to Perceptron.train_batch: the number of epochs run, the
+# number of mini-batch steps which changed the weights and the number of
+# misclassified rows in each epoch.
+TrainingReport = namedtuple('TrainingReport', ['epochs', 'updates', 'errors'])
+
+def _train_epochs(Xtr, w, step, epochs, batch_size, patience, tol, chunk_size,
+                  stats, verbose):
+    """
+    Run the epochs of mini-batch training shared by Perceptron.train_batch
+    and PerceptronBank.train_batch, with their early stopping, and return a
+    TrainingReport. step(piece, delta) adds the update for a piece of a
+    mini-batch to delta and returns the number of errors it made; the
+    accumulated delta is added to the weights w, in place, at the end of each
+    mini-batch which made errors.
+    """
+    delta = np.zeros_like(w)
+    updates = 0
+    errors = []
+    best = None
+    stale = 0
+    for epoch in range(epochs):
+        if stats is not None:
+            start = time.perf_counter()
+        wrong = 0
+        misses = 0
+        rows = 0
+        for piece in _batches(Xtr, batch_size, chunk_size):
+            if piece is None:
+                # End of a mini-batch: apply its accumulated update.
+                if misses:
+                    w += delta
+                    delta[:] = 0
+                    wrong += misses
+                    misses = 0
+                    updates += 1
+                continue
+            rows += len(piece)
+            if stats is not None:
+                stats.samples += len(piece)
+            misses += step(piece, delta)
+        if not rows:
+            raise ValueError("Xtr yielded no rows in epoch {}; pass a "
+                             "re-iterable, such as a list of chunks, to "
+                             "train for more than one epoch.".format(epoch))
+        errors.append(wrong)
+        if stats is not None:
+            stats.epochs.append(time.perf_counter() - start)
+        if verbose:
+            print("epoch:", epoch, "errors:", wrong)
+            print("weights:", w)
+        if wrong == 0:
+            break
+        if best is None or wrong < best - tol:
+            best = wrong
+            stale = 0
+        else:
+            stale += 1
+            if patience is not None and stale >= patience:
+                break
+    return TrainingReport(len(errors), updates, errors)
+
+def _accuracy(predict, Xtr, chunk_size):
+    """
+    Return the fraction of rows of Xtr, streamed as by _chunks, for which
+    predict of the inputs equals the last column. Raises a ValueError if Xtr
+    has no rows.
+    """
+    correct = 0
+    total = 0
+    for chunk in _chunks(Xtr, chunk_size):
+        correct += np.count_nonzero(predict(chunk[:, :-1]) == chunk[:, -1])
+        total += len(chunk)
+    if not total:
+        raise ValueError("Cannot measure accuracy on no rows.")
+    return correct/total
+
 class Perceptron:
+    # Set to an ann.stats.Stats to collect statistics.
+    stats = None
+
     def __init__(self, ni, weights = None, func = functions.heaviside):
         """
         Create a perceptron instance.
@@ -9,19 +143,32 @@ class Perceptron:
         self.ni = ni
         
         try:
-            self.weights = list(weights)
+            # Arrays, such as memory mapped weights, are used without copying.
+            if isinstance(weights, np.ndarray):
+                self.weights = weights
+            else:
+                self.weights = list(weights)
             assert(len(self.weights)==ni+1)
         except TypeError:
             self.weights = [0]*(ni+1)
         if func:
             self.func = func
         else:
-            self.func = sum
+            self.func = functions.identity
             
+    @property
+    def func(self):
+        return self._func
+
+    @func.setter
+    def func(self, func):
+        self._func = func
+        self.activation = functions.get(func)
+
     def activate(self, in_vec):
         in_vec = [1]+list(in_vec)
         assert(len(in_vec)==len(self.weights))
-        return self.func(sum([v*w for v, w in zip(in_vec, self.weights)]))
+        return self.activation.scalar(sum([v*w for v, w in zip(in_vec, self.weights)]))
     
     def train(self, Xtr, alpha = 0.1, iterations = 100, verbose = False):
         """
@@ -60,10 +207,216 @@ class Perceptron:
         # have a default number of iterations
         # perhaps have some arguments about other termination criteria.
         
-    def accuracy(self, Xtr):
-        results = [self.activate(row[:-1])==row[-1] for row in Xtr]
-        return sum(results)/len(results)
+    def train_batch(self, Xtr, alpha = 0.1, epochs = 100, batch_size = None,
+                    patience = None, tol = 0, chunk_size = 65536, verbose = False):
+        """
+        Train the perceptron with the same update rule as train, but with
+        NumPy array operations over mini-batches of rows. The outputs for a
+        mini-batch are computed with the current weights and the updates for
+        all of its rows are applied together. batch_size = 1 reproduces the
+        online updates of train, and leaving batch_size as None trains on the
+        full batch. After training, weights is a numpy.array.
+        
+        Rows are streamed through the update loop chunk_size at a time, so Xtr
+        need not fit in memory: it may be a numpy.memmap, the path of a .npy
+        file, an iterable of arrays of rows or an iterable of rows. The
+        iterable is iterated once per epoch, so it should be re-iterable (eg.
+        a list) when training for more than one. Results do not depend on chunk_size or on how the rows
+        are chunked, only on their order.
+        
+        Training stops early after the first epoch with no misclassified rows,
+        since later epochs could not change the weights, or once the best
+        epoch error count has not improved by more than tol for patience
+        epochs in a row. An epoch in which Xtr yields no rows, as a one-shot
+        iterator does after the first, raises a ValueError rather than
+        counting as converged.
+        
+        Xtr : numpy.array
+          A two dimensional array, with the target in the last column.
+        alpha : float
+          The learning rate of the algorithm.
+        epochs : int
+          Number of passes over the rows of Xtr.
+        batch_size : int
+          Number of rows per weight update. Defaults to all of them.
+        patience : int
+          Number of epochs without improvement to allow before stopping. By
+          default training only stops early on convergence.
+        tol : int
+          Decrease in the error count below which an epoch does not count as
+          an improvement.
+        chunk_size : int
+          Maximum number of rows held in memory at once.
+        
+        Returns
+        -------
+        report : TrainingReport
+        """
+        w = np.array(self.weights, dtype=np.float64)
+        func = self.activation.array
+        def step(piece, delta):
+            assert(piece.shape[1]==self.ni+1)
+            X = piece[:, :-1]
+            diff = piece[:, -1] - func(X @ w[1:] + w[0])
+            m = np.count_nonzero(diff)
+            if m:
+                err = alpha * diff
+                delta[0] += err.sum()
+                delta[1:] += err @ X
+            return m
+        report = _train_epochs(Xtr, w, step, epochs, batch_size, patience, tol,
+                               chunk_size, self.stats, verbose)
+        self.weights = w
+        return report
+        
+    def predict(self, X):
+        """
+        Activate the perceptron on every row of X at once, as a single matrix
+        product followed by an elementwise activation.
+        
+        X : numpy.array
+          A two dimensional array of inputs, one row per sample.
+        
+        Returns
+        -------
+        outputs : numpy.array
+        """
+        w = np.asarray(self.weights, dtype=np.float64)
+        return self.activation.array(np.asarray(X) @ w[1:] + w[0])
+        
+    def accuracy(self, Xtr, chunk_size = 65536):
+        """
+        Return the fraction of rows of Xtr, with the target in the last
+        column, which the perceptron classifies correctly. Like train_batch,
+        Xtr may be an array, a numpy.memmap, the path of a .npy file, an
+        iterable of arrays of rows or an iterable of rows, and is predicted
+        chunk_size rows at a time.
+        Raises a ValueError if Xtr has no rows.
+        """
+        return _accuracy(self.predict, Xtr, chunk_size)
     
+class PerceptronBank:
+    """
+    One-vs-rest classifier made of one perceptron per class, with the weights
+    of all of them held as the rows of a matrix. Training updates every
+    class from one shared pass over the data, with the update rule of
+    Perceptron.train_batch, where the target of class k is whether a row's
+    label is classes[k]. Training each row of weights alone with
+    Perceptron.train_batch gives the same weights, but reads the data once
+    per class.
+    """
+    # Set to an ann.stats.Stats to collect statistics.
+    stats = None
+
+    def __init__(self, ni, classes, weights = None, func = functions.heaviside):
+        """
+        Arguments
+        ---------
+        ni : int
+          Number of inputs.
+        classes : list
+          The class labels, as found in the last column of training data.
+        weights : numpy.array
+          A (len(classes), ni+1) array, one row of bias and input weights per
+          class, which is copied. Defaults to zeros.
+        func : function, str or Activation
+          Activation function of every perceptron.
+        """
+        self.ni = ni
+        self.classes = np.asarray(classes)
+        if weights is None:
+            self.weights = np.zeros((len(self.classes), ni+1))
+        else:
+            self.weights = np.array(weights, dtype=np.float64)
+            assert(self.weights.shape==(len(self.classes), ni+1))
+        self.func = func or functions.identity
+
+    @classmethod
+    def from_perceptrons(cls, classes, perceptrons):
+        """
+        Build a bank from one Perceptron per class, which must share their
+        number of inputs and func.
+        """
+        ni = perceptrons[0].ni
+        assert(all(p.ni==ni for p in perceptrons))
+        return cls(ni, classes, [p.weights for p in perceptrons],
+                   perceptrons[0].func)
+
+    @property
+    def func(self):
+        return self._func
+
+    @func.setter
+    def func(self, func):
+        self._func = func
+        self.activation = functions.get(func)
+
+    def perceptron(self, k):
+        """
+        Return the Perceptron of the k'th class, sharing its weights.
+        """
+        return Perceptron(self.ni, self.weights[k], self.func)
+
+    def outputs(self, X):
+        """
+        Return the (n_samples, n_classes) outputs of every class's perceptron
+        on the rows of X, as one matrix product.
+        """
+        return self.activation.array(self.scores(X))
+
+    def scores(self, X):
+        """
+        Return the (n_samples, n_classes) weighted sums of every class's
+        perceptron on the rows of X, before activation.
+        """
+        return np.asarray(X) @ self.weights[:, 1:].T + self.weights[:, 0]
+
+    def predict(self, X):
+        """
+        Return the label of every row of X: the class whose perceptron has
+        the largest weighted sum.
+        """
+        return self.classes[np.argmax(self.scores(X), axis=1)]
+
+    def activate(self, in_vec):
+        return self.predict([list(in_vec)])[0]
+
+    def train_batch(self, Xtr, alpha = 0.1, epochs = 100, batch_size = None,
+                    patience = None, tol = 0, chunk_size = 65536, verbose = False):
+        """
+        Train every class's perceptron from one pass over Xtr per epoch. The
+        arguments and early stopping are those of Perceptron.train_batch,
+        with the class label in the last column of Xtr. A row counts as an
+        error once per class that gets it wrong.
+
+        Returns
+        -------
+        report : TrainingReport
+        """
+        W = self.weights
+        func = self.activation.array
+        def step(piece, delta):
+            assert(piece.shape[1]==self.ni+1)
+            X = piece[:, :-1]
+            targets = piece[:, -1:] == self.classes
+            diff = targets - func(X @ W[:, 1:].T + W[:, 0])
+            m = np.count_nonzero(diff)
+            if m:
+                err = alpha * diff
+                delta[:, 0] += err.sum(axis=0)
+                delta[:, 1:] += err.T @ X
+            return m
+        return _train_epochs(Xtr, W, step, epochs, batch_size, patience, tol,
+                             chunk_size, self.stats, verbose)
+
+    def accuracy(self, Xtr, chunk_size = 65536):
+        """
+        Return the fraction of rows of Xtr, with the label in the last column,
+        which are predicted correctly. Xtr may be anything accepted by
+        Perceptron.accuracy.
+        """
+        return _accuracy(self.predict, Xtr, chunk_size)
+
 class Network:
     def __init__(self, V, E, weights, func = None):
         """
@@ -75,19 +428,130 @@ class Network:
            of any edge mapped tuple, and similarly max(V) must not be the head of any edge mapped tuple.
         """
         self.V = V
+        self._weights = weights
         self.E = E
-        self.network = {e:0 for e in E}    # activated values on the edges. One approach for now.
-        self.weights = weights
-        if func:
-            self.func = func
-        else:
-            self.func = lambda x: x
+        self.func = func or functions.identity
     
-    def activate(self, in_vec):
+    @property
+    def func(self):
+        return self._func
+
+    @func.setter
+    def func(self, func):
+        self._func = func
+        self.activation = functions.get(func)
+
+    @property
+    def E(self):
+        return self._E
+    
+    @E.setter
+    def E(self, E):
+        self._E = set(E)
+        self.network = {e:0 for e in self._E}    # activated values on the edges. One approach for now.
+        self._index()
+        
+    @property
+    def weights(self):
+        return self._weights
+    
+    @weights.setter
+    def weights(self, weights):
+        self._weights = weights
+        self._index()
+        
+    def _index(self):
+        # Per vertex tables of incoming and outgoing edges, mapping each edge
+        # to its weight, so that firing a vertex only touches its own edges.
+        self.ins = {v:{} for v in self.V}
+        self.outs = {v:{} for v in self.V}
+        for e in self.E:
+            self.ins[e[1]][e] = self.weights[e]
+            self.outs[e[0]][e] = self.weights[e]
+        self._schedule = None
+    
+    def add_edge(self, e, weight):
         """
-        Fire the neurons! With vector "in_vec", fire the neurons and return and "out_vec".
+        Add the edge e = (head, tail) between two vertices of V with the given
+        weight, or reweight it if it is already present.
         """
+        assert(e[0] in self.outs and e[1] in self.ins)
+        if e not in self.E:
+            self.E.add(e)
+            self.network[e] = 0
+        self.set_weight(e, weight)
         
+    def remove_edge(self, e):
+        """
+        Remove the edge e = (head, tail) from the network.
+        """
+        self.E.remove(e)
+        del self.network[e]
+        del self.weights[e]
+        del self.ins[e[1]][e]
+        del self.outs[e[0]][e]
+        self._schedule = None
+        
+    def set_weight(self, e, weight):
+        """
+        Set the weight on the edge e. Use this rather than assigning into
+        weights, which would leave the edge tables stale.
+        """
+        self.weights[e] = weight
+        self.ins[e[1]][e] = weight
+        self.outs[e[0]][e] = weight
+        self._schedule = None
+        
+    def compile(self):
+        """
+        Compile the network into a firing schedule, cached until E or weights
+        change. The schedule is a tuple (source, steps, sink) where source is
+        the source vertex's outgoing edges in the order inputs are assigned
+        to them, steps lists an (ins, outs) pair for every other vertex in
+        topological order, with ins a tuple of (edge, weight) pairs, and sink
+        is the sink vertex's incoming edges in output order.
+        
+        Raises
+        ------
+        ValueError
+          If the network contains a cycle.
+        """
+        if self._schedule is None:
+            indegree = {v:len(self.ins[v]) for v in self.V}
+            queue = deque(sorted(v for v in self.V if indegree[v] == 0))
+            order = []
+            while queue:
+                v = queue.popleft()
+                order.append(v)
+                for e in self.outs[v]:
+                    indegree[e[1]] -= 1
+                    if indegree[e[1]] == 0:
+                        queue.append(e[1])
+            if len(order) != len(indegree):
+                raise ValueError("Network contains a cycle.")
+            source, sink = min(self.V), max(self.V)
+            steps = [(tuple(self.ins[v].items()), tuple(self.outs[v]))
+                     for v in order if v not in (source, sink)]
+            self._schedule = (sorted(self.outs[source], key=lambda e: e[1]),
+                              steps,
+                              sorted(self.ins[sink], key=lambda e: e[0]))
+        return self._schedule
+        
+    def activate(self, in_vec):
+        """
+        Fire the neurons! With vector "in_vec", fire the neurons along the compiled schedule and return the
+        "out_vec" collected on the edges into the sink.
+        """
+        source, steps, sink = self.compile()
+        network = self.network
+        func = self.activation.scalar
+        for e, i in zip(source, in_vec):
+            network[e] = i
+        for ins, outs in steps:
+            val = func(sum([w*network[e] for e, w in ins]))
+            for e in outs:
+                network[e] = val
+        return [network[e] for e in sink]
 
     def fire(self, v, in_vec = None):
         """
@@ -99,24 +563,24 @@ class Network:
         
         RE: vertex class. Can be subclassed for source and sink this fire method could be overwritten...
         """
-        ins = {e for e in self.E if e[1] == v}
-        outs = {e for e in self.E if e[0] == v}
+        ins = self.ins[v]
+        outs = self.outs[v]
         
-        if ins == {}:
+        if not ins:
             # Then we are the source vertex
-            sorted_outs = [(v, o) for o in [e[1] for e in outs].sort()]    # Important that we consider order here.
-            if in_vec:
+            sorted_outs = sorted(outs, key=lambda e: e[1])    # Important that we consider order here.
+            if in_vec is not None:
                 for e, i in zip(sorted_outs, in_vec):
                     self.network[e] = i
             else:
                 raise Exception("Input vector not defined.")
-        elif outs == {}:
+        elif not outs:
             # Then we are the sink vertex
             # Don't need to do anything?
             pass
         else:
             # The we are neither a source nor sink vertex and so we are a vertex in the neural network to be fired.
-            val = self.func(sum([self.weights[e]*self.network[e] for e in ins]))
+            val = self.activation.scalar(sum([w*self.network[e] for e, w in ins.items()]))
             for e in outs:
                 self.network[e] = val
                 
@@ -0,0 +1,260 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import functions
+from .network import Perceptron
+
+# Shared memory blocks attached to by this (worker) process, by name.
+_attached = {}
+
+def _attach(name):
+    if name not in _attached:
+        _attached[name] = shared_memory.SharedMemory(name=name)
+    return _attached[name]
+
+def _evaluate(values, weights, heads, vertices, sink, func):
+    """
+    Evaluate some of the vertices of one level for a batch, reading the
+    activations of their heads from values and writing theirs back into it.
+    """
+    z = values[:, heads] @ weights
+    z[:, ~sink] = func(z[:, ~sink])
+    values[:, vertices] = z
+
+def _evaluate_shared(values_spec, rows, weights_spec, cols, heads, vertices,
+                     sink, func):
+    """
+    _evaluate for a process worker, with values and the level's weights in
+    shared memory. The specs are (name, shape, offset) triples locating the
+    arrays in their blocks, and cols the slice of weight columns to use.
+    """
+    name, shape, offset = values_spec
+    values = np.ndarray(shape, np.float64, _attach(name).buf, offset)[:rows]
+    name, shape, offset = weights_spec
+    weights = np.ndarray(shape, np.float64, _attach(name).buf, offset)[:, cols]
+    _evaluate(values, weights, heads, vertices, sink,
+              functions.get(func, reduction=True).array)
+
+class ParallelFeedforward:
+    """
+    Evaluate an ANN level by level, as feedforward_batch does, but split the
+    vertices of every level between the workers of a concurrent.futures
+    pool. Vertices in the same level do not depend on each other, so the
+    parts of a level are evaluated concurrently and the levels in turn.
+
+    With a ThreadPoolExecutor the workers share the arrays directly and run
+    concurrently inside the matrix products, which release the GIL. With a
+    ProcessPoolExecutor the weights are copied once into shared memory and
+    the activations for each chunk of the batch are written to a shared
+    buffer, so nothing but indices is pickled per task. The ANN's func must
+    have an array form, so be registered in ann.functions. Call close, or use the
+    object as a context manager, to release the shared memory.
+    """
+
+    def __init__(self, ann, executor, parts=None, chunk_size=4096):
+        """
+        Arguments
+        ---------
+        ann : ANN
+          The network to evaluate. Later changes to its matrix are not seen.
+        executor : concurrent.futures.Executor
+          The pool to evaluate on.
+        parts : int
+          Number of parts each level is split into, by default the number of
+          CPUs.
+        chunk_size : int
+          Number of samples evaluated together.
+        """
+        self.ann = ann
+        self.executor = executor
+        self.processes = isinstance(executor, ProcessPoolExecutor)
+        self.chunk_size = chunk_size
+        self.sources = list(ann.sources())
+        self.sinks = list(ann.sinks())
+        self.func = ann.activation.name or ann.func
+        self.array = functions.array_form(ann.activation)
+        parts = parts or os.cpu_count()
+        self.plan = []
+        for vertices, heads, weights, sink in ann.batch_plan():
+            splits = np.array_split(np.arange(len(vertices)),
+                                    min(parts, len(vertices)))
+            self.plan.append((vertices, heads, weights, sink,
+                              [slice(s[0], s[-1] + 1) for s in splits]))
+        self._blocks = []
+        if self.processes:
+            self._share()
+
+    def _share(self):
+        size = sum(weights.nbytes for _, _, weights, _, _ in self.plan)
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._blocks.append(block)
+        offset = 0
+        self._weights = []
+        for _, _, weights, _, _ in self.plan:
+            np.ndarray(weights.shape, np.float64, block.buf, offset)[:] = weights
+            self._weights.append((block.name, weights.shape, offset))
+            offset += weights.nbytes
+        shape = (self.chunk_size, self.ann.order())
+        block = shared_memory.SharedMemory(
+            create=True, size=max(np.prod(shape)*8, 1))
+        self._blocks.append(block)
+        self._values = np.ndarray(shape, np.float64, block.buf)
+        self._values_spec = (block.name, shape, 0)
+
+    def close(self):
+        """
+        Release the shared memory used by process workers.
+        """
+        self._values = None
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _level(self, values, rows, i):
+        vertices, heads, weights, sink, splits = self.plan[i]
+        if self.processes:
+            return [self.executor.submit(
+                        _evaluate_shared, self._values_spec, rows,
+                        self._weights[i], s, heads, vertices[s], sink[s],
+                        self.func)
+                    for s in splits]
+        return [self.executor.submit(_evaluate, values, weights[:, s], heads,
+                                     vertices[s], sink[s], self.array)
+                for s in splits]
+
+    def feedforward_batch(self, X):
+        """
+        Feed a batch of inputs through the network.
+
+        Arguments
+        ---------
+        X : numpy.array
+          A two dimensional array with one row of source values per sample.
+
+        Returns
+        -------
+        outputs : numpy.array
+          A (n_samples, n_sinks) array, with columns in the order of sinks().
+        """
+        X = np.asarray(X, dtype=np.float64)
+        assert(X.ndim==2 and X.shape[1]==len(self.sources))
+        out = np.empty((X.shape[0], len(self.sinks)))
+        for start in range(0, X.shape[0], self.chunk_size):
+            stop = min(start + self.chunk_size, X.shape[0])
+            if self.processes:
+                values = self._values[:stop - start]
+            else:
+                values = np.empty((stop - start, self.ann.order()))
+            values[:, self.sources] = X[start:stop]
+            for i in range(len(self.plan)):
+                for future in self._level(values, stop - start, i):
+                    future.result()
+            out[start:stop] = values[:, self.sinks]
+        return out
+
+    def feedforward(self, vals):
+        """
+        Feed a single input through the network, returning a dict of sink
+        vertex index to output like ANN.feedforward.
+        """
+        return dict(zip(self.sinks, self.feedforward_batch([vals])[0]))
+
+# The training data and model settings of a train_parallel worker process.
+_trainer = {}
+
+def _init_trainer(data, ni, func):
+    if isinstance(data, tuple):
+        name, shape, dtype = data
+        data = np.ndarray(shape, dtype, _attach(name).buf)
+    else:
+        data = np.load(data, mmap_mode='r')
+    _trainer.update(Xtr=data, ni=ni, func=func)
+
+def _train_shard(args):
+    """
+    Run one epoch of Perceptron.train_batch over the rows start:stop of the
+    worker's training data, starting from the given weights.
+    """
+    (start, stop), weights, alpha, batch_size = args
+    p = Perceptron(_trainer['ni'], weights, _trainer['func'])
+    report = p.train_batch(_trainer['Xtr'][start:stop], alpha, epochs=1,
+                           batch_size=batch_size)
+    return p.weights, report.errors[0]
+
+def train_parallel(perceptron, Xtr, alpha=0.1, epochs=100, batch_size=None,
+                   processes=None):
+    """
+    Train a copy of a perceptron on a pool of processes by iterative parameter
+    mixing: Xtr is split into one shard per process, every epoch each process
+    runs an epoch of train_batch over its shard from the current weights,
+    and the resulting weights are averaged, weighted by shard size. Training
+    stops early after an epoch in which no shard misclassified a row.
+
+    The processes read Xtr from shared memory rather than being sent copies:
+    an array is copied once into a shared block, and the path of a .npy file
+    is memory mapped by every process, sharing the page cache. The
+    perceptron's func must be registered in ann.functions or picklable.
+
+    Arguments
+    ---------
+    perceptron : Perceptron
+      The perceptron giving the number of inputs, func and initial weights.
+      It is not modified.
+    Xtr : numpy.array
+      A two dimensional array, or the path of a .npy file holding one, with
+      the target in the last column.
+    alpha : float
+      The learning rate of the algorithm.
+    epochs : int
+      Maximum number of epochs.
+    batch_size : int
+      Number of rows per weight update within a shard, by default the shard.
+    processes : int
+      Number of processes and shards, by default the number of CPUs.
+
+    Returns
+    -------
+    perceptron : Perceptron
+      A new Perceptron with the merged weights.
+    """
+    processes = processes or os.cpu_count()
+    block = None
+    if isinstance(Xtr, (str, os.PathLike)):
+        data = os.fspath(Xtr)
+        n = np.load(data, mmap_mode='r').shape[0]
+    else:
+        Xtr = np.asarray(Xtr)
+        n = Xtr.shape[0]
+        block = shared_memory.SharedMemory(create=True, size=max(Xtr.nbytes, 1))
+        np.ndarray(Xtr.shape, Xtr.dtype, block.buf)[:] = Xtr
+        data = (block.name, Xtr.shape, Xtr.dtype.str)
+    bounds = np.linspace(0, n, processes + 1).astype(int)
+    shards = [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    sizes = np.array([b - a for a, b in shards], dtype=np.float64)
+    func = perceptron.activation.name or perceptron.func
+    weights = np.array(perceptron.weights, dtype=np.float64)
+    try:
+        with multiprocessing.Pool(processes, _init_trainer,
+                                  (data, perceptron.ni, func)) as pool:
+            for epoch in range(epochs):
+                results = pool.map(_train_shard, [(shard, weights, alpha, batch_size)
+                                                  for shard in shards])
+                weights = sizes @ np.array([w for w, _ in results]) / sizes.sum()
+                if not any(errors for _, errors in results):
+                    break
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
+    return Perceptron(perceptron.ni, weights, perceptron.func)
@@ -0,0 +1,114 @@
+"""
+Weight pruning and compaction for Graph and ANN models.
+
+prune drops the edges whose weight is smaller in magnitude than a threshold
+or outside a budget of the largest top_k weights into each vertex, then
+removes the vertices left unreachable from the sources or unable to reach a
+sink, and renumbers the rest into a smaller graph. Edges into sinks are
+never dropped, since they carry the outputs. The vertices kept keep their
+relative order, so sources() and sinks() of the pruned graph correspond to
+those of the original.
+"""
+from collections import deque, namedtuple
+
+import numpy as np
+
+from .ann import ANN
+from .graph import CSR
+
+# Result of prune: the number of edges and vertices removed, the original
+# index of every vertex of the pruned graph, and the largest and mean
+# absolute difference in outputs on the validation batch (None without one).
+PruneReport = namedtuple('PruneReport', ['edges_removed', 'vertices_removed',
+                                         'vertices', 'max_error', 'mean_error'])
+
+def _reach(csr, start):
+    """
+    Return a boolean mask of the vertices reachable from start along csr.
+    """
+    seen = np.zeros(csr.order(), dtype=bool)
+    seen[list(start)] = True
+    queue = deque(start)
+    while queue:
+        for v in csr.neighbours(queue.popleft()).tolist():
+            if not seen[v]:
+                seen[v] = True
+                queue.append(v)
+    return seen
+
+def prune(graph, threshold=0, top_k=None, X=None):
+    """
+    Return a pruned copy of graph, which is not modified.
+
+    Arguments
+    ---------
+    graph : Graph or ANN
+      The graph to prune. The copy has the same type, backend and, for an
+      ANN, func.
+    threshold : float
+      Edges with a weight of smaller magnitude are dropped.
+    top_k : int
+      If given, only the top_k edges of largest magnitude into each vertex
+      are kept.
+    X : numpy.array
+      Validation batch of source values for an ANN, fed through both
+      networks to measure the difference in outputs.
+
+    Returns
+    -------
+    pruned : Graph or ANN
+    report : PruneReport
+
+    Raises
+    ------
+    ValueError
+      If pruning would disconnect a source from every sink, or a sink from
+      every source.
+    """
+    index = graph.index()
+    n = graph.order()
+    tails = index.tails
+    heads = np.repeat(np.arange(n, dtype=np.int64), tails.degrees())
+    ends = tails.indices
+    weights = tails.data
+    magnitude = np.abs(weights)
+    keep = magnitude >= threshold
+    if top_k is not None:
+        # Rank the edges into each vertex by decreasing magnitude.
+        order = np.lexsort((-magnitude, ends))
+        first = np.searchsorted(ends[order], ends[order])
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order)) - first
+        keep &= rank < top_k
+    sinks = np.zeros(n, dtype=bool)
+    sinks[list(index.sinks)] = True
+    keep |= sinks[ends]
+
+    kept = CSR.from_arrays(heads[keep], ends[keep], weights[keep], n)
+    live = _reach(kept, index.sources) & _reach(kept.transpose(), index.sinks)
+    for V in index.sources:
+        if not live[V]:
+            raise ValueError("Pruning disconnects source {} from every sink.".format(V))
+    for V in index.sinks:
+        if not live[V]:
+            raise ValueError("Pruning disconnects sink {} from every source.".format(V))
+
+    vertices = np.flatnonzero(live)
+    number = np.full(n, -1, dtype=np.int64)
+    number[vertices] = np.arange(len(vertices))
+    keep &= live[heads] & live[ends]
+    matrix = CSR.from_arrays(number[heads[keep]], number[ends[keep]],
+                             weights[keep], len(vertices))
+    if isinstance(graph, ANN):
+        pruned = type(graph)(matrix, graph.func, backend=graph.backend)
+    else:
+        pruned = type(graph)(matrix, backend=graph.backend)
+
+    max_error = mean_error = None
+    if X is not None:
+        error = np.abs(pruned.feedforward_batch(X) - graph.feedforward_batch(X))
+        max_error = float(error.max(initial=0))
+        mean_error = float(error.mean()) if error.size else 0.0
+    report = PruneReport(len(weights) - int(keep.sum()), n - len(vertices),
+                         vertices, max_error, mean_error)
+    return pruned, report
@@ -0,0 +1,185 @@
+"""
+Reduced precision inference for ANN and Perceptron models.
+
+quantize(model, dtype) returns a copy of a model's weights for batched
+inference in float32, or in int8 with one scale factor per layer (each
+level of an ANN, the whole weight vector of a Perceptron): a weight w is
+stored as round(w/scale), with scale = max|w|/127. Activations are computed
+in float32 for both. NumPy has no int8 matrix product, so int8 weights are
+widened to float32 one layer at a time as they are used, and are only stored
+at a quarter of the float32 size.
+
+accuracy_drift and output_drift compare the modes with the float64 model, to
+choose a precision per model.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .ann import ANN
+from .functions import array_form
+from .network import Perceptron, _accuracy
+
+DTYPES = ('float64', 'float32', 'int8')
+
+# Accuracy of a Perceptron in one precision: the bytes its weights take, its
+# accuracy and its drift, the float64 accuracy minus its own.
+AccuracyDrift = namedtuple('AccuracyDrift',
+                           ['dtype', 'weight_bytes', 'accuracy', 'drift'])
+
+# Outputs of an ANN in one precision: the bytes its weights take and the
+# largest and mean absolute differences from the float64 outputs.
+OutputDrift = namedtuple('OutputDrift',
+                         ['dtype', 'weight_bytes', 'max_error', 'mean_error'])
+
+def quantize_weights(weights, dtype):
+    """
+    Return (q, scale), where q is weights stored in dtype and scale the
+    factor to multiply q by to recover them.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if dtype != 'int8':
+        return weights.astype(dtype), 1.0
+    bound = np.abs(weights).max(initial=0)
+    scale = bound/127 if bound else 1.0
+    return np.rint(weights/scale).astype(np.int8), scale
+
+def _product(x, q, scale):
+    # Only int8 weights are widened; float weights are used as stored.
+    z = x @ q.astype(x.dtype, copy=False)
+    if scale != 1.0:
+        z *= z.dtype.type(scale)
+    return z
+
+class QuantizedPerceptron:
+    """
+    The weights of a Perceptron in reduced precision, for predict and
+    accuracy.
+    """
+
+    def __init__(self, perceptron, dtype='float32'):
+        """
+        Arguments
+        ---------
+        perceptron : Perceptron
+          The model to take the weights and activation of.
+        dtype : str
+          One of DTYPES.
+        """
+        assert(dtype in DTYPES)
+        self.ni = perceptron.ni
+        self.dtype = dtype
+        self.activation = perceptron.activation
+        self.weights, self.scale = quantize_weights(perceptron.weights, dtype)
+        self.compute = np.float64 if dtype == 'float64' else np.float32
+
+    @property
+    def nbytes(self):
+        return self.weights.nbytes
+
+    def predict(self, X):
+        """
+        Activate the perceptron on every row of X at once, as
+        Perceptron.predict.
+        """
+        X = np.asarray(X, dtype=self.compute)
+        z = _product(X, self.weights[1:], self.scale)
+        z += self.compute(self.weights[0]*self.scale)
+        return self.activation.array(z)
+
+    def accuracy(self, Xtr, chunk_size=65536):
+        """
+        Return the fraction of rows of Xtr, with the target in the last
+        column, classified correctly, as Perceptron.accuracy.
+        """
+        return _accuracy(self.predict, Xtr, chunk_size)
+
+class QuantizedANN:
+    """
+    The weights of an ANN's batch plan in reduced precision, with one scale
+    per level, for feedforward_batch. Later changes to the ANN are not seen.
+    """
+
+    def __init__(self, ann, dtype='float32'):
+        """
+        Arguments
+        ---------
+        ann : ANN
+          The model to take the plan and activation of.
+        dtype : str
+          One of DTYPES.
+        """
+        assert(dtype in DTYPES)
+        self.dtype = dtype
+        self.activation = ann.activation
+        self.array = array_form(ann.activation)
+        self.order = ann.order()
+        self.sources = list(ann.sources())
+        self.sinks = list(ann.sinks())
+        self.compute = np.float64 if dtype == 'float64' else np.float32
+        self.plan = []
+        for vertices, heads, weights, sink in ann.batch_plan():
+            q, scale = quantize_weights(weights, dtype)
+            self.plan.append((vertices, heads, q, scale, sink))
+
+    @property
+    def nbytes(self):
+        return sum(q.nbytes for _, _, q, _, _ in self.plan)
+
+    def feedforward_batch(self, X, chunk_size=4096):
+        """
+        Feed a batch of inputs through the network, as ANN.feedforward_batch.
+        """
+        X = np.asarray(X)
+        assert(X.ndim==2 and X.shape[1]==len(self.sources))
+        func = self.array
+        out = np.empty((X.shape[0], len(self.sinks)), dtype=self.compute)
+        for start in range(0, X.shape[0], chunk_size):
+            stop = min(start + chunk_size, X.shape[0])
+            values = np.empty((stop - start, self.order), dtype=self.compute)
+            values[:, self.sources] = X[start:stop]
+            for vertices, heads, q, scale, sink in self.plan:
+                z = _product(values[:, heads], q, scale)
+                z[:, ~sink] = func(z[:, ~sink])
+                values[:, vertices] = z
+            out[start:stop] = values[:, self.sinks]
+        return out
+
+def quantize(model, dtype='float32'):
+    """
+    Return a QuantizedANN or QuantizedPerceptron of model in dtype.
+    """
+    if isinstance(model, ANN):
+        return QuantizedANN(model, dtype)
+    if isinstance(model, Perceptron):
+        return QuantizedPerceptron(model, dtype)
+    raise TypeError("Cannot quantize a {}.".format(type(model).__name__))
+
+def accuracy_drift(perceptron, Xtr, dtypes=DTYPES, chunk_size=65536):
+    """
+    Return a list of AccuracyDrift, one per dtype, comparing the accuracy of
+    perceptron on Xtr in that precision with Perceptron.accuracy.
+    """
+    reference = perceptron.accuracy(Xtr, chunk_size)
+    report = []
+    for dtype in dtypes:
+        model = QuantizedPerceptron(perceptron, dtype)
+        accuracy = model.accuracy(Xtr, chunk_size)
+        report.append(AccuracyDrift(dtype, model.nbytes, accuracy,
+                                    reference - accuracy))
+    return report
+
+def output_drift(ann, X, dtypes=DTYPES, chunk_size=4096):
+    """
+    Return a list of OutputDrift, one per dtype, comparing the outputs of ann
+    on X in that precision with ANN.feedforward_batch.
+    """
+    reference = ann.feedforward_batch(X, chunk_size)
+    report = []
+    for dtype in dtypes:
+        model = QuantizedANN(ann, dtype)
+        error = np.abs(model.feedforward_batch(X, chunk_size) - reference)
+        report.append(OutputDrift(dtype, model.nbytes,
+                                  float(error.max(initial=0)),
+                                  float(error.mean()) if error.size else 0.0))
+    return report
@@ -0,0 +1,120 @@
+"""
+Binary on-disk format for Graph, ANN and Perceptron models.
+
+A file is the magic bytes, the length of a JSON header as a little endian
+uint64, the header, and then the model's arrays, each aligned to 64 bytes.
+The header records the kind of model, its settings and the dtype, shape and
+offset of every array. Graphs store the successor and predecessor CSRs of
+their index and ANNs also the name of their activation function, which must
+be registered in ann.functions. Perceptrons store their weights.
+
+load memory maps the arrays copy-on-write, so loading takes the same time
+whatever the size of the model, and processes loading the same file share
+one copy of the weights through the page cache until they modify them.
+"""
+import json
+
+import numpy as np
+
+from .ann import ANN
+from .graph import CSR, Graph, Index
+from .network import Perceptron
+
+MAGIC = b'MLPLAY\x00\x01'
+ALIGN = 64
+
+def _arrays(model):
+    if isinstance(model, Perceptron):
+        return {'weights': np.asarray(model.weights, dtype=np.float64)}
+    index = model.index()
+    return {'tails.indptr': index.tails.indptr,
+            'tails.indices': index.tails.indices,
+            'tails.data': index.tails.data,
+            'heads.indptr': index.heads.indptr,
+            'heads.indices': index.heads.indices,
+            'heads.data': index.heads.data}
+
+def save(model, path):
+    """
+    Save a Graph, ANN or Perceptron to path.
+
+    Raises
+    ------
+    ValueError
+      If the model's activation function is not registered in ann.functions.
+    """
+    header = {'kind': type(model).__name__}
+    if isinstance(model, (ANN, Perceptron)):
+        if model.activation.name is None:
+            raise ValueError("Only registered activation functions can be saved.")
+        header['activation'] = model.activation.name
+    if isinstance(model, Perceptron):
+        header['ni'] = model.ni
+    elif not isinstance(model, Graph):
+        raise TypeError("Cannot save a {}.".format(type(model).__name__))
+    arrays = {name: np.ascontiguousarray(a) for name, a in _arrays(model).items()}
+    # The array offsets depend on the length of the header, so grow the space
+    # reserved for the header until it fits.
+    size = ALIGN
+    while True:
+        offset = size
+        header['arrays'] = {}
+        for name, a in arrays.items():
+            header['arrays'][name] = {'dtype': a.dtype.str, 'shape': a.shape,
+                                      'offset': offset}
+            offset += -(-a.nbytes // ALIGN) * ALIGN
+        raw = json.dumps(header).encode('utf-8')
+        if len(MAGIC) + 8 + len(raw) <= size:
+            break
+        size = -(-(len(MAGIC) + 8 + len(raw)) // ALIGN) * ALIGN
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(raw)).tobytes())
+        f.write(raw)
+        for name, a in arrays.items():
+            f.seek(header['arrays'][name]['offset'])
+            f.write(a.tobytes())
+        f.truncate(offset)
+
+def load(path, mmap=True):
+    """
+    Load a model saved with save. Graphs and ANNs come back with the sparse
+    backend and their index ready built.
+
+    Arguments
+    ---------
+    path : str
+      Path of the file.
+    mmap : bool
+      Whether to memory map the arrays (copy-on-write) instead of reading
+      them into memory.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a saved model.".format(path))
+        length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(length).decode('utf-8'))
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        if mmap and np.prod(spec['shape']) > 0:
+            arrays[name] = np.memmap(path, dtype=spec['dtype'], mode='c',
+                                     offset=spec['offset'],
+                                     shape=tuple(spec['shape']))
+        else:
+            arrays[name] = np.fromfile(path, dtype=spec['dtype'],
+                                       count=int(np.prod(spec['shape'])),
+                                       offset=spec['offset'])
+    if header['kind'] == 'Perceptron':
+        return Perceptron(header['ni'], arrays['weights'], header['activation'])
+    tails, heads = [CSR(arrays[prefix + '.indptr'], arrays[prefix + '.indices'],
+                        arrays[prefix + '.data'])
+                    for prefix in ('tails', 'heads')]
+    if header['kind'] == 'ANN':
+        model = ANN(tails, header['activation'], backend='sparse')
+    else:
+        model = Graph(tails, backend='sparse')
+    model._cache['index'] = Index(
+        heads, tails,
+        tuple(np.flatnonzero(heads.degrees() == 0).tolist()),
+        tuple(np.flatnonzero(tails.degrees() == 0).tolist()))
+    return model
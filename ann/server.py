@@ -0,0 +1,302 @@
+"""
+Asyncio inference server for ANN and Perceptron models.
+
+Requests are queued and gathered into micro-batches of at most
+max_batch_size requests, waiting at most max_wait seconds after the first
+request of a batch for more to arrive. Each batch is scored with one batched
+forward pass on an executor, so the event loop keeps accepting requests
+meanwhile, and every request's future is resolved with its own outputs.
+
+Over a socket the protocol is newline delimited JSON: a client sends
+{"inputs": [...]} and gets back {"outputs": {vertex: value, ...}}, or
+{"error": message}.
+
+    python -m ann.server model.bin --port 8000
+    python -m ann.server model.bin --load-test --requests 10000
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .ann import ANN
+from .network import Perceptron
+
+class InferenceServer:
+    def __init__(self, model, max_batch_size=64, max_wait=0.002, executor=None):
+        """
+        Arguments
+        ---------
+        model : ANN or Perceptron
+          The model to serve.
+        max_batch_size : int
+          Maximum number of requests scored together.
+        max_wait : float
+          Maximum seconds to wait for a batch to fill after its first request.
+        executor : concurrent.futures.Executor
+          Where batches are scored. Defaults to a single worker thread, which
+          the server creates when started and shuts down when stopped.
+        """
+        if isinstance(model, ANN):
+            self.keys = list(model.sinks())
+            self.width = len(model.sources())
+        elif isinstance(model, Perceptron):
+            self.keys = [0]
+            self.width = model.ni
+        else:
+            raise TypeError("Cannot serve a {}.".format(type(model).__name__))
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self._owns_executor = executor is None
+        self.batches = 0
+        self.requests = 0
+        self._queue = None
+        self._batcher = None
+        # The queue get in progress and the batch being gathered or scored.
+        self._get = None
+        self._batch = []
+
+    def _score(self, X):
+        if isinstance(self.model, ANN):
+            return self.model.feedforward_batch(X)
+        return self.model.predict(X)[:, None]
+
+    async def start(self):
+        """
+        Start gathering queued requests into batches.
+        """
+        if self._owns_executor:
+            self.executor = ThreadPoolExecutor(1)
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """
+        Stop batching. Requests still queued or being scored are cancelled.
+        Does nothing if the server is not running.
+        """
+        if self._batcher is None:
+            return
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        self._batcher = None
+        while not self._queue.empty():
+            self._queue.get_nowait()[1].cancel()
+        if self._owns_executor:
+            # A batch still being scored is left to finish in the background.
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def submit(self, vals):
+        """
+        Queue one input for scoring and return its outputs, a dict of output
+        vertex index (0 for a Perceptron) to value. Raises a ValueError, without
+        affecting other requests, unless vals holds one number per input of
+        the model.
+        """
+        vals = np.asarray(vals, dtype=np.float64)
+        if vals.shape != (self.width,):
+            raise ValueError("Expected {} inputs, got shape {}.".format(
+                self.width, vals.shape))
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((vals, future))
+        return await future
+
+    async def _gather(self):
+        """
+        Return the next batch of queued (vals, future) pairs.
+        """
+        loop = asyncio.get_running_loop()
+        # The batch is kept on self so that stop can cancel it.
+        batch = self._batch = []
+        # A get that timed out is kept for the next batch rather than
+        # cancelled, since cancelling could lose an item it had just taken.
+        if self._get is None:
+            self._get = asyncio.ensure_future(self._queue.get())
+        batch.append(await self._get)
+        self._get = None
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            self._get = asyncio.ensure_future(self._queue.get())
+            done, _ = await asyncio.wait({self._get}, timeout=timeout)
+            if not done:
+                break
+            batch.append(self._get.result())
+            self._get = None
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = self._batch = [(vals, f) for vals, f in await self._gather()
+                                       if not f.cancelled()]
+                if not batch:
+                    continue
+                try:
+                    X = np.stack([vals for vals, _ in batch])
+                    Y = await loop.run_in_executor(self.executor, self._score, X)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.cancelled():
+                            future.set_exception(e)
+                    continue
+                self.batches += 1
+                self.requests += len(batch)
+                for (_, future), y in zip(batch, Y.tolist()):
+                    if not future.cancelled():
+                        future.set_result(dict(zip(self.keys, y)))
+        finally:
+            # Nothing will answer the batch being gathered or scored, nor a
+            # request already taken from the queue by a finished get.
+            for _, future in self._batch:
+                future.cancel()
+            if self._get is not None:
+                if self._get.done() and not self._get.cancelled():
+                    self._get.result()[1].cancel()
+                else:
+                    self._get.cancel()
+            self._get = None
+            self._batch = []
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    outputs = await self.submit(json.loads(line)['inputs'])
+                    response = {'outputs': outputs}
+                except Exception as e:
+                    response = {'error': str(e)}
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=0):
+        """
+        Start batching and listen for clients on host and port, returning the
+        asyncio.Server. Port 0 picks a free port, which can be read from
+        server.sockets[0].getsockname().
+        """
+        if self._batcher is None:
+            await self.start()
+        return await asyncio.start_server(self._handle, host, port)
+
+class Client:
+    """
+    Client for an InferenceServer listening on a socket. Requests on one
+    client are sent one at a time; use several clients for concurrency.
+    """
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        return self
+
+    async def predict(self, vals):
+        """
+        Score one input, returning a dict of output vertex index to value.
+        """
+        self.writer.write(json.dumps({'inputs': list(vals)}).encode('utf-8') + b'\n')
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return {int(k): v for k, v in response['outputs'].items()}
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+async def load_test(host, port, inputs, requests=1000, concurrency=32):
+    """
+    Send requests requests, drawn in turn from the rows of inputs, to a
+    server from concurrency concurrent clients, and return a dict of the
+    throughput (requests per second) and the p50 and p99 latencies (seconds).
+    """
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker():
+        client = await Client().connect(host, port)
+        try:
+            for i in counter:
+                start = time.perf_counter()
+                await client.predict(inputs[i % len(inputs)])
+                latencies.append(time.perf_counter() - start)
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {'requests': requests,
+            'throughput': requests/elapsed,
+            'p50': float(np.percentile(latencies, 50)),
+            'p99': float(np.percentile(latencies, 99))}
+
+def main(argv=None):
+    from .serialize import load
+
+    parser = argparse.ArgumentParser(description="Serve a saved model.")
+    parser.add_argument('model', help="path of a model saved by ann.serialize")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait', type=float, default=0.002)
+    parser.add_argument('--load-test', action='store_true',
+                        help="run the load generator against the server and exit")
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args(argv)
+
+    model = load(args.model)
+    n = len(model.sources()) if isinstance(model, ANN) else model.ni
+
+    async def run():
+        server = InferenceServer(model, args.max_batch_size, args.max_wait)
+        listener = await server.serve(args.host, args.port)
+        host, port = listener.sockets[0].getsockname()[:2]
+        print("Serving on {}:{}".format(host, port))
+        async with listener:
+            if not args.load_test:
+                await listener.serve_forever()
+            inputs = np.random.RandomState(0).uniform(-1, 1, (1000, n)).tolist()
+            result = await load_test(host, port, inputs, args.requests,
+                                     args.concurrency)
+        await server.stop()
+        print("{requests} requests: {throughput:.0f} req/s, "
+              "p50 {p50:.6f}s, p99 {p99:.6f}s".format(**result))
+        print("Mean batch size: {:.1f}".format(server.requests/server.batches))
+
+    asyncio.run(run())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+class Stats:
+    """
+    Counters and timings collected by instrumented Graph, ANN and Perceptron
+    objects. Instrumentation is opt in: assign a Stats to the stats attribute
+    of an object (several objects may share one) and set it back to None to
+    turn it off. While stats is None the hooks cost an attribute check.
+
+    Attributes
+    ----------
+    vertex_evaluations : int
+      Non-source vertices evaluated by ANN feedforward, once per sample.
+    edge_multiplications : int
+      Edge weights multiplied by ANN feedforward, once per sample.
+    heads_calls, tails_calls : int
+      Calls to Graph.heads and Graph.tails.
+    cache_hits, cache_misses : int
+      Lookups of cached structure derived from a Graph's matrix (index,
+      topological order, levels and ANN plans) that were and weren't cached.
+    samples : int
+      Samples fed forward by ANN and rows seen by Perceptron training.
+    phases : dict
+      Total seconds spent in each named phase, such as 'feedforward.plan'.
+    epochs : list
+      Seconds taken by each epoch of Perceptron.train_batch.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.vertex_evaluations = 0
+        self.edge_multiplications = 0
+        self.heads_calls = 0
+        self.tails_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.samples = 0
+        self.phases = {}
+        self.epochs = []
+
+    @contextmanager
+    def time(self, phase):
+        """
+        Context manager adding the time spent inside it to phases[phase].
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase] = (self.phases.get(phase, 0)
+                                  + time.perf_counter() - start)
+
+    def as_dict(self):
+        return {'vertex_evaluations': self.vertex_evaluations,
+                'edge_multiplications': self.edge_multiplications,
+                'heads_calls': self.heads_calls,
+                'tails_calls': self.tails_calls,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'samples': self.samples,
+                'phases': dict(self.phases),
+                'epochs': list(self.epochs)}
+
+    def __repr__(self):
+        return "Stats({})".format(self.as_dict())
+
+def phase(stats, name):
+    """
+    Return stats.time(name), or a context manager doing nothing if stats is
+    None.
+    """
+    return nullcontext() if stats is None else stats.time(name)
@@ -1,11 +1,15 @@
 import unittest
+import numpy as np
 from ann.ann import ANN
 from ann.tests.test_graph import TestGraphBase
 from ann.functions import heaviside
+from ann.stats import Stats
 
 class TestANNBase(TestGraphBase):
+    backend = 'list'
+
     def setUp(self):
-        self.G=ANN([[None]], sum)
+        self.G=ANN([[None]], sum, self.backend)
         self.costs={(0,0):None}    # pair: cost dict.
         self.heads={0:()}
         self.tails={0:()}
@@ -20,6 +24,54 @@ class TestANNBase(TestGraphBase):
             self.assertEqual({i:round(o, 6) for i, o in
                               self.G.feedforward(inputs).items()},output)
 
+    def testFeedforwardBatch(self):
+        inputs = list(self.outputs)
+        expected = [[self.outputs[i][V] for V in self.sinks] for i in inputs]
+        np.testing.assert_allclose(self.G.feedforward_batch(np.array(inputs)),
+                                   expected)
+        np.testing.assert_allclose(
+            self.G.feedforward_batch(np.array(inputs), chunk_size=1), expected)
+
+    def testFusedMatchesGeneric(self):
+        X = np.array(list(self.outputs))
+        fused = self.G.fused()
+        if fused is not None:
+            self.G._cache['fused'] = None
+            generic = self.G.feedforward_batch(X)
+            np.testing.assert_allclose(fused.feedforward_batch(X, 2), generic)
+
+    def testSparseEngine(self):
+        engine = self.G.engine()
+        self.assertIs(self.G.engine(), engine)
+        inputs = list(self.outputs)
+        for i in inputs:
+            self.assertEqual({V:round(o, 6) for V, o in
+                              engine.feedforward(i).items()}, self.outputs[i])
+        np.testing.assert_allclose(
+            engine.feedforward_batch(np.array(inputs), chunk_size=2),
+            self.G.feedforward_batch(np.array(inputs)))
+
+    def testUpdate(self):
+        inputs = list(self.outputs)
+        for i in inputs + inputs[::-1]:
+            self.assertEqual({V:round(o, 6) for V, o in
+                              self.G.update(i).items()}, self.outputs[i])
+
+    def testEvaluatesEachVertexOnce(self):
+        calls = []
+        func = self.G.func
+        self.G.func = lambda x: calls.append(x) or func(x)
+        hidden = self.order - len(set(self.sources) | set(self.sinks))
+        for inputs in self.outputs:
+            del calls[:]
+            self.G.feedforward(inputs)
+            self.assertEqual(len(calls), hidden)
+
+    def testPlanIsCached(self):
+        self.assertIs(self.G.plan(), self.G.plan())
+        self.G.matrix = self.G.matrix
+        self.assertEqual(self.G._cache, {})
+
 #    def testFeedforward0_1(self):
 #        self.assertEqual(self.G.feedforward((0.1,)), self.outputs[(0.1,)])
 #
@@ -48,7 +100,7 @@ class TestNetSimple(TestANNBase):
                     [None,None,None,None,None,   1,None],
                     [None,None,None,None,None,   1,None],
                     [None,None,None,None,None,None,   1],
-                    [None,None,None,None,None,None,None]], sum)
+                    [None,None,None,None,None,None,None]], sum, self.backend)
         self.costs={(i,i):None for i in range(7)}
         rest={(0,1):1,(0,2):1,(1,3):1,(1,4):1,(2,3):1,(2,4):1,(3,5):1,(4,5):1}
         self.costs.update(rest)
@@ -59,6 +111,53 @@ class TestNetSimple(TestANNBase):
         self.order = 7
         self.outputs={(0.1,):{6:0.4},(1,):{6:4},(5,):{6:20}}
 
+    def testUpdateOnlyChangedCone(self):
+        self.G.stats = Stats()
+        self.G.update((1,))
+        self.assertEqual(self.G.stats.vertex_evaluations, 6)
+        self.assertEqual(self.G.stats.edge_multiplications, 9)
+        self.G.update((1,))
+        self.assertEqual(self.G.stats.vertex_evaluations, 6)
+        self.G.update((2,))
+        self.assertEqual(self.G.stats.vertex_evaluations, 12)
+        self.assertEqual(self.G.stats.edge_multiplications, 18)
+        self.G.set_cost(3, 5, 2)
+        self.assertEqual(self.G.update((1,)), {6:6})
+
+    def testUpdateChecksInputCount(self):
+        self.G.feedforward((1,))
+        self.assertRaises(ValueError, self.G.update, ())
+        self.assertRaises(ValueError, self.G.update, (1, 2))
+
+    def testUpdateAfterSetFunc(self):
+        self.assertEqual(self.G.feedforward((-1,)), {6:-4})
+        self.G.func = 'relu'
+        self.assertEqual(self.G.update((-1,)), {6:0})
+        self.G.func = 'identity'
+        self.assertEqual(self.G.update((-1,)), {6:-4})
+
+    def testActivateAfterSetInputs(self):
+        self.G.feedforward((1,))
+        self.assertEqual(self.G.activate(5), 4)
+        self.G.inputs = {0: 5}
+        self.assertEqual(self.G.activate(5), 20)
+
+    def testActivateAfterSetCost(self):
+        self.G.feedforward((1,))
+        self.assertEqual(self.G.activate(5), 4)
+        self.G.set_cost(3, 5, 2)
+        self.assertEqual(self.G.activate(5), 6)
+
+    def testFused(self):
+        self.assertIsNotNone(self.G.fused())
+        self.G.set_cost(0, 3, 1)
+        self.assertIsNone(self.G.fused())
+
+    def testSetCostInvalidatesPlan(self):
+        self.assertEqual(self.G.feedforward((1,)), {6:4})
+        self.G.set_cost(5, 6, 2)
+        self.assertEqual(self.G.feedforward((1,)), {6:8})
+
 class TestPerceptron(TestANNBase):
     """
     --->
@@ -77,7 +176,7 @@ class TestPerceptron(TestANNBase):
                     [None,None,None,None,None],
                     [ 0.3,None,None,None,None],
                     [ 0.5,None,None,None,None],
-                    [   1,None,None,None,None]], sum)
+                    [   1,None,None,None,None]], sum, self.backend)
         self.costs={(2,0):0.3, (3,0):0.5, (4,0):1, (0,1):1}
         self.heads={2:(), 3:(), 4:(), 0:(2,3,4), 1:(0,)}
         self.tails={2:(0,), 3:(0,), 4:(0,), 0:(1,), 1:()}
@@ -105,7 +204,7 @@ class TestPerceptronHeaviside(TestANNBase):
                     [None,None,None,None,None],
                     [ 0.3,None,None,None,None],
                     [ 0.5,None,None,None,None],
-                    [   1,None,None,None,None]], heaviside)
+                    [   1,None,None,None,None]], heaviside, self.backend)
         self.costs={(2,0):0.3, (3,0):0.5, (4,0):1, (0,1):1}
         self.heads={2:(), 3:(), 4:(), 0:(2,3,4), 1:(0,)}
         self.tails={2:(0,), 3:(0,), 4:(0,), 0:(1,), 1:()}
@@ -136,7 +235,7 @@ class TestGershenson1(TestANNBase):
                     [None,None,None,None,None,None,   1,None],
                     [None,None,None,None,None,None,None,   1],
                     [None,None,None,None,None,None,None,None],
-                    [None,None,None,None,None,None,None,None]], sum)
+                    [None,None,None,None,None,None,None,None]], sum, self.backend)
         self.costs={(0,2):1, (1,3):1, (2,4):1, (3,5):1, (4,6):1, (5,7):1}
         self.heads={0:(), 1:(), 2:(0,), 3:(1,), 4:(2,3), 5:(2,3), 6:(4,), 7:(5,)}
         self.tails={0:(2,), 1:(3,), 2:(4,5), 3:(4,5), 4:(6,), 5:(7,), 6:(), 7:()}
@@ -145,7 +244,42 @@ class TestGershenson1(TestANNBase):
         self.order=8
         self.outputs={(1,1):{6:2, 7:2}}
 
+    def testNotFused(self):
+        self.assertIsNone(self.G.fused())
+
+
+class TestUnregisteredReduction(unittest.TestCase):
+    """
+    max acts on the weighted inputs themselves, not on their sum.
+    """
+    def setUp(self):
+        self.G = ANN([[None,None,   1,None],
+                      [None,None,   1,None],
+                      [None,None,None,   1],
+                      [None,None,None,None]], max)
+
+    def testBatchMatchesFeedforward(self):
+        self.assertEqual(self.G.feedforward((1, 2)), {3: 2})
+        np.testing.assert_array_equal(
+            self.G.feedforward_batch([[1, 2], [4, 3]]), [[2], [4]])
+
+    def testArrayPathsRaise(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from ann.parallel import ParallelFeedforward
+        from ann.quantize import quantize
+        self.assertRaises(ValueError, self.G.engine().feedforward, (1, 2))
+        self.assertRaises(ValueError, self.G.engine().feedforward_batch, [[1, 2]])
+        with ThreadPoolExecutor(1) as executor:
+            self.assertRaises(ValueError, ParallelFeedforward, self.G, executor)
+        self.assertRaises(ValueError, quantize, self.G)
+
 
+# Run every test above on the compact backends too.
+for backend in ('dense', 'sparse'):
+    for cls in (TestANNBase, TestNetSimple, TestPerceptron,
+                TestPerceptronHeaviside, TestGershenson1):
+        name = cls.__name__ + backend.capitalize()
+        globals()[name] = type(name, (cls,), {'backend': backend})
 
 # def testHeaviside(ins, weights, outs):
 #        print(heaviside([i*w for i, w in zip(ins,weights)]), outs)
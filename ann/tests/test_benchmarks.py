@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+import unittest
+from benchmarks.suite import compare, main
+
+class TestCompare(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {'a': {'seconds': 1.0, 'peak_bytes': 1000},
+                         'b': {'seconds': 2.0, 'peak_bytes': 100}}
+
+    def testWithinTolerance(self):
+        results = {'a': {'seconds': 1.2, 'peak_bytes': 1200},
+                   'b': {'seconds': 1.0, 'peak_bytes': 50}}
+        self.assertEqual(compare(results, self.baseline, 0.25), [])
+
+    def testRegressions(self):
+        results = {'a': {'seconds': 1.3, 'peak_bytes': 1000},
+                   'b': {'seconds': 2.0, 'peak_bytes': 200}}
+        regressions = compare(results, self.baseline, 0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('a: 1.3000s'))
+        self.assertTrue(regressions[1].startswith('b: peak 200 bytes'))
+
+    def testNewCasesAreSkipped(self):
+        results = {'c': {'seconds': 10.0, 'peak_bytes': 10**9}}
+        self.assertEqual(compare(results, self.baseline, 0.25), [])
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.args = ['--baseline', os.path.join(self.dir, 'baseline.json'),
+                     '--filter', 'perceptron.accuracy', '--repeat', '1',
+                     '--tolerance', '100']
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testMissingBaselineFails(self):
+        self.assertEqual(main(self.args), 1)
+        self.assertEqual(main(self.args + ['--save']), 0)
+        self.assertEqual(main(self.args), 0)
+
+if __name__ == '__main__':
+    unittest.main()
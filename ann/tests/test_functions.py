@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+import ann.functions as fn
+
+class TestActivations(unittest.TestCase):
+    def setUp(self):
+        self.z = np.array([-100, -2, -0.5, 0, 0.5, 2, 100], dtype=float)
+
+    def testHeavisideScalarAndIterable(self):
+        self.assertEqual([fn.heaviside(x) for x in self.z], [0, 0, 0, 0, 1, 1, 1])
+        self.assertEqual(fn.heaviside([0.5, -1]), 0)
+        self.assertEqual(fn.heaviside([0.5, 1]), 1)
+
+    def testFormsAgree(self):
+        for name, a in fn.ACTIVATIONS.items():
+            scalar = [a.scalar(x) for x in self.z]
+            np.testing.assert_allclose(a.array(self.z), scalar, err_msg=name)
+            out = np.empty_like(self.z)
+            self.assertIs(a.array(self.z, out=out), out)
+            np.testing.assert_allclose(out, scalar, err_msg=name)
+            np.testing.assert_allclose([a.reduce([x/2, x/2]) for x in self.z],
+                                       scalar, err_msg=name)
+
+    def testGet(self):
+        self.assertIs(fn.get('tanh'), fn.ACTIVATIONS['tanh'])
+        self.assertIs(fn.get(fn.sigmoid), fn.ACTIVATIONS['sigmoid'])
+        self.assertIs(fn.get(sum, reduction=True), fn.ACTIVATIONS['identity'])
+        a = fn.get(lambda x: 2*x)
+        self.assertEqual(a.scalar(3), 6)
+        np.testing.assert_array_equal(a.array(np.array([1., 2.])), [2, 4])
+        a = fn.get(max, reduction=True)
+        self.assertEqual(a.reduce([1, 3, 2]), 3)
+        self.assertEqual(a.scalar(3), 3)
+        self.assertIsNone(a.array)
+        self.assertRaises(ValueError, fn.array_form, a)
@@ -1,9 +1,16 @@
+import os
+import shutil
+import tempfile
 import unittest
-from ann.graph import Graph
+import numpy as np
+from ann.ann import ANN
+from ann.graph import CSR, EDGE_DTYPE, Graph
 
 class TestGraphBase(unittest.TestCase):
+    backend = 'list'
+
     def setUp(self):
-        self.G=Graph([[None]])
+        self.G=Graph([[None]], self.backend)
         self.costs={}    # pair: cost dict.
         self.heads={0:()}
         self.tails={0:()}
@@ -34,6 +41,32 @@ class TestGraphBase(unittest.TestCase):
     def testOrder(self):
         self.assertEqual(self.G.order(), self.order)
 
+    def testMatrixIsReadOnly(self):
+        matrix = self.G.matrix
+        with self.assertRaises(TypeError):
+            matrix[0][0] = 1
+        with self.assertRaises(TypeError):
+            matrix.append([])
+        self.assertEqual(self.G.matrix, matrix)
+        self.G.set_cost(0, 0, 2)
+        self.assertEqual(self.G.cost(0, 0), 2)
+        self.assertEqual(self.G.matrix[0][0], 2)
+
+    def testTopologicalOrder(self):
+        order = self.G.topological_order()
+        self.assertEqual(sorted(order), list(range(self.order)))
+        for V, heads in self.heads.items():
+            for v in heads:
+                self.assertLess(order.index(v), order.index(V))
+
+    def testLevels(self):
+        depth = {V: d for d, level in enumerate(self.G.levels()) for V in level}
+        self.assertEqual(sorted(depth), list(range(self.order)))
+        self.assertEqual(tuple(self.G.levels()[0]), self.sources)
+        for V, heads in self.heads.items():
+            for v in heads:
+                self.assertLess(depth[v], depth[V])
+
 class TestGraphSimple(TestGraphBase):
     """
     --->
@@ -53,7 +86,8 @@ class TestGraphSimple(TestGraphBase):
                       [None,None,None,   1,   1,None],
                       [None,None,None,None,None,   1],
                       [None,None,None,None,None,   1],
-                      [None,None,None,None,None,None]])
+                      [None,None,None,None,None,None]],
+                     backend = self.backend)
         self.costs={(i,i):None for i in range(6)}
         rest={(0,1):1,(0,2):1,(1,3):1,(1,4):1,(2,3):1,(2,4):1,(3,5):1,(4,5):1}
         self.costs.update(rest)
@@ -62,3 +96,79 @@ class TestGraphSimple(TestGraphBase):
         self.sources = (0,)
         self.sinks = (5,)
         self.order = 6
+
+    def testSetCostUpdatesIndex(self):
+        self.assertEqual(self.G.sinks(), (5,))
+        self.G.set_cost(5, 0, 1)
+        self.assertEqual(self.G.heads(0), [5])
+        self.assertEqual(self.G.sinks(), ())
+        self.assertRaises(ValueError, self.G.topological_order)
+        self.G.set_cost(5, 0, None)
+        self.assertEqual(self.G.sources(), (0,))
+
+class TestCSR(unittest.TestCase):
+    def setUp(self):
+        self.matrix = [[None, 2, None], [None, None, None], [1, 3, 4]]
+        self.csr = CSR.from_matrix(self.matrix)
+
+    def testTranspose(self):
+        t = self.csr.transpose()
+        self.assertEqual(t.neighbours(1).tolist(), [0, 2])
+        self.assertEqual(t.weights(1).tolist(), [2, 3])
+        self.assertEqual(t.neighbours(0).tolist(), [2])
+
+    def testDot(self):
+        x = np.array([[1., 10, 100], [2, 0, 1]])
+        dense = np.array([[0 if c is None else c for c in row]
+                          for row in self.matrix])
+        np.testing.assert_allclose(self.csr.dot(x), x @ dense.T)
+        np.testing.assert_allclose(self.csr.dot(x[0]), dense @ x[0])
+
+class TestGraphConstructors(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.edges = [(3, 5, 1), (0, 1, 1), (0, 2, 0.5), (1, 3, 1), (1, 4, 1),
+                      (2, 3, 2), (2, 4, 1), (4, 5, 1)]
+        self.matrix = [[None]*6 for _ in range(6)]
+        for h, t, w in self.edges:
+            self.matrix[h][t] = w
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testFromEdges(self):
+        G = Graph.from_edges(iter(self.edges))
+        self.assertEqual(G.backend, 'sparse')
+        self.assertEqual(G.matrix, self.matrix)
+        self.assertEqual(Graph.from_edges(self.edges, backend='list').matrix,
+                         self.matrix)
+        self.assertEqual(Graph.from_edges(self.edges, order=8).order(), 8)
+        self.assertEqual(Graph.from_edges([]).order(), 0)
+        self.assertRaises(ValueError, Graph.from_edges, self.edges*2)
+
+    def testFromEdgesOutOfRange(self):
+        self.assertRaises(ValueError, Graph.from_edges, [(0, 5, 1.0)], order=3)
+        self.assertRaises(ValueError, Graph.from_edges, [(5, 0, 1.0)], order=3)
+        self.assertRaises(ValueError, Graph.from_edges, [(-1, 0, 1.0)])
+        self.assertRaises(ValueError, CSR.from_arrays, [0], [-2], [1.0], 3)
+
+    def testFromNetwork(self):
+        weights = {('a', 'b'): 2, ('b', 'c'): 3}
+        G = ANN.from_network(['c', 'b', 'a'], list(weights), weights, func=sum)
+        self.assertEqual(G.feedforward((1,)), {2: 6})
+
+    def testFromFile(self):
+        path = os.path.join(self.dir, 'edges.csv')
+        with open(path, 'w') as f:
+            f.write("# head,tail,weight\n")
+            f.write("\n".join("{},{},{}".format(*e) for e in self.edges))
+        self.assertEqual(Graph.from_file(path).matrix, self.matrix)
+        path = os.path.join(self.dir, 'edges.bin')
+        np.array(self.edges, dtype=EDGE_DTYPE).tofile(path)
+        self.assertEqual(Graph.from_file(path).matrix, self.matrix)
+
+# Run every test above on the compact backends too.
+for backend in ('dense', 'sparse'):
+    for cls in (TestGraphBase, TestGraphSimple):
+        name = cls.__name__ + backend.capitalize()
+        globals()[name] = type(name, (cls,), {'backend': backend})
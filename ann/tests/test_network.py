@@ -0,0 +1,239 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from ann.network import Network, Perceptron, PerceptronBank
+
+def step(x):
+    return 1 if x > 0 else 0
+
+class TestPerceptronTraining(unittest.TestCase):
+    def setUp(self):
+        # Logical AND, with the target in the last column.
+        self.Xtr = np.array([[0, 0, 0],
+                             [0, 1, 0],
+                             [1, 0, 0],
+                             [1, 1, 1]], dtype=float)
+
+    def testOnlineBatchParity(self):
+        online = Perceptron(2, func=step)
+        online.train(self.Xtr, iterations=5*len(self.Xtr))
+        batch = Perceptron(2, func=step)
+        batch.train_batch(self.Xtr, epochs=5, batch_size=1)
+        np.testing.assert_allclose(batch.weights, online.weights)
+
+    def testBatchWeightsAreArray(self):
+        p = Perceptron(2, func=step)
+        p.train_batch(self.Xtr, epochs=1, batch_size=3)
+        self.assertIsInstance(p.weights, np.ndarray)
+        self.assertEqual(p.weights.shape, (3,))
+
+    def testFullBatchLearnsAnd(self):
+        p = Perceptron(2, func=step)
+        p.train_batch(self.Xtr, epochs=50)
+        self.assertEqual([p.activate(row[:-1]) for row in self.Xtr],
+                         list(self.Xtr[:, -1]))
+
+    def testPredict(self):
+        p = Perceptron(2, weights=[-1.5, 1, 1], func=step)
+        np.testing.assert_array_equal(p.predict(self.Xtr[:, :-1]),
+                                      [p.activate(row[:-1]) for row in self.Xtr])
+        self.assertEqual(p.accuracy(self.Xtr), 1)
+        p = Perceptron(2, weights=[0, 1, 1], func=step)
+        self.assertEqual(p.accuracy(self.Xtr), 0.5)
+
+    def testStopsOnConvergence(self):
+        p = Perceptron(2, func=step)
+        report = p.train_batch(self.Xtr, epochs=1000, batch_size=1)
+        self.assertLess(report.epochs, 1000)
+        self.assertEqual(report.epochs, len(report.errors))
+        self.assertEqual(report.errors[-1], 0)
+        self.assertTrue(all(e > 0 for e in report.errors[:-1]))
+        self.assertLessEqual(report.updates, sum(report.errors))
+
+    def testStopsOnPatience(self):
+        # XOR is not linearly separable, so training never converges.
+        Xtr = np.array([[0, 0, 0], [0, 1, 1], [1, 0, 1], [1, 1, 0]], dtype=float)
+        p = Perceptron(2, func=step)
+        report = p.train_batch(Xtr, epochs=1000, batch_size=1, patience=3)
+        self.assertLess(report.epochs, 1000)
+        self.assertTrue(all(e > 0 for e in report.errors))
+
+
+class TestPerceptronStreaming(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        X = rng.uniform(-1, 1, (50, 3))
+        self.Xtr = np.column_stack([X, X @ [1, -2, 0.5] > 0.1]).astype(float)
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'Xtr.npy')
+        np.save(self.path, self.Xtr)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def train(self, Xtr, **kwargs):
+        p = Perceptron(3, func=step)
+        report = p.train_batch(Xtr, epochs=20, batch_size=3, **kwargs)
+        return p.weights, report
+
+    def testStreamedTrainingMatchesInMemory(self):
+        weights, report = self.train(self.Xtr)
+        chunks = [self.Xtr[i:i+7] for i in range(0, len(self.Xtr), 7)]
+        for Xtr, kwargs in [(self.path, {'chunk_size': 4}),
+                            (np.load(self.path, mmap_mode='r'), {}),
+                            (chunks, {})]:
+            w, r = self.train(Xtr, **kwargs)
+            np.testing.assert_allclose(w, weights)
+            self.assertEqual(r, report)
+
+    def testOneShotIteratorIsNotConverged(self):
+        chunks = iter([self.Xtr[:25], self.Xtr[25:]])
+        p = Perceptron(3, func=step)
+        self.assertRaises(ValueError, p.train_batch, chunks, epochs=20,
+                          batch_size=1)
+        # A single epoch over a one-shot iterator is fine.
+        p = Perceptron(3, func=step)
+        report = p.train_batch(iter([self.Xtr]), epochs=1, batch_size=1)
+        self.assertEqual(report.epochs, 1)
+
+    def testListOfRows(self):
+        p = Perceptron(3, weights=[0, 1, -2, 0.5], func=step)
+        rows = self.Xtr.tolist()
+        self.assertEqual(p.accuracy(rows, chunk_size=8), p.accuracy(self.Xtr))
+        self.assertEqual(p.accuracy(iter(rows)), p.accuracy(self.Xtr))
+        self.assertEqual(p.accuracy([[1, 1, 1, 1]]), 0)
+        weights, report = self.train(self.Xtr)
+        w, r = self.train(rows, chunk_size=4)
+        np.testing.assert_allclose(w, weights)
+        self.assertEqual(r, report)
+
+    def testEmptyAccuracy(self):
+        p = Perceptron(3, func=step)
+        self.assertRaises(ValueError, p.accuracy, iter([]))
+
+    def testStreamedAccuracy(self):
+        p = Perceptron(3, weights=[0, 1, -2, 0.5], func=step)
+        expected = p.accuracy(self.Xtr)
+        self.assertEqual(p.accuracy(self.path, chunk_size=8), expected)
+        self.assertEqual(p.accuracy(iter([self.Xtr[:20], self.Xtr[20:]])),
+                         expected)
+
+class TestPerceptronBank(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        X = rng.uniform(-1, 1, (60, 3))
+        labels = np.argmax(X @ rng.uniform(-1, 1, (3, 4)), axis=1)
+        self.Xtr = np.column_stack([X, labels]).astype(float)
+        self.classes = [0, 1, 2, 3]
+
+    def testMatchesSeparatePerceptrons(self):
+        bank = PerceptronBank(3, self.classes, func=step)
+        report = bank.train_batch(self.Xtr, epochs=10, batch_size=7)
+        errors = 0
+        for k, c in enumerate(self.classes):
+            Xtr = self.Xtr.copy()
+            Xtr[:, -1] = Xtr[:, -1] == c
+            p = Perceptron(3, func=step)
+            errors += sum(p.train_batch(Xtr, epochs=10, batch_size=7).errors)
+            np.testing.assert_allclose(bank.weights[k], p.weights)
+            np.testing.assert_allclose(bank.perceptron(k).predict(Xtr[:, :-1]),
+                                       bank.outputs(Xtr[:, :-1])[:, k])
+        self.assertEqual(sum(report.errors), errors)
+
+    def testPredictAndAccuracy(self):
+        weights = np.array([[0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]], dtype=float)
+        bank = PerceptronBank(3, ['a', 'b', 'c'], weights)
+        X = np.array([[1, 0, 0], [0, 2, 1], [0, -1, 3]])
+        self.assertEqual(list(bank.predict(X)), ['a', 'b', 'c'])
+        self.assertEqual(bank.activate([0, 0, 1]), 'c')
+        bank = PerceptronBank(3, [0, 1, 2], weights)
+        Xtr = np.column_stack([X, [0, 1, 1]])
+        self.assertEqual(bank.accuracy(Xtr), 2/3)
+        self.assertEqual(bank.accuracy([Xtr[:1], Xtr[1:]], chunk_size=1), 2/3)
+
+    def testWeightsAreCopied(self):
+        weights = np.zeros((4, 4))
+        bank = PerceptronBank(3, self.classes, weights, func=step)
+        bank.train_batch(self.Xtr, epochs=1)
+        self.assertFalse(weights.any())
+        self.assertTrue(bank.weights.any())
+
+    def testLearns(self):
+        bank = PerceptronBank(3, self.classes, func=step)
+        bank.train_batch(self.Xtr, epochs=200, batch_size=1)
+        self.assertGreater(bank.accuracy(self.Xtr), 0.8)
+
+    def testOneShotIteratorIsNotConverged(self):
+        bank = PerceptronBank(3, self.classes, func=step)
+        chunks = iter([self.Xtr[:30], self.Xtr[30:]])
+        self.assertRaises(ValueError, bank.train_batch, chunks, epochs=10)
+        self.assertRaises(ValueError, bank.accuracy, [])
+
+    def testFromPerceptrons(self):
+        perceptrons = [Perceptron(2, [k, 1, -1], step) for k in range(3)]
+        bank = PerceptronBank.from_perceptrons([5, 6, 7], perceptrons)
+        self.assertEqual(bank.weights.tolist(),
+                         [[0, 1, -1], [1, 1, -1], [2, 1, -1]])
+        self.assertIs(bank.func, step)
+
+
+class TestNetwork(unittest.TestCase):
+    r"""
+    --->
+         1
+         o
+        / \
+     0 o   o 3
+        \ /
+         o
+         2
+    """
+    def setUp(self):
+        self.weights = {(0,1):1, (0,2):1, (1,3):2, (2,3):3}
+        self.N = Network([0, 1, 2, 3], list(self.weights), dict(self.weights))
+
+    def fire_all(self, in_vec):
+        for v in [0, 1, 2, 3]:
+            self.N.fire(v, in_vec)
+        return [self.N.network[e] for e in [(1,3), (2,3)]]
+
+    def testEdgeTables(self):
+        self.assertEqual(self.N.ins[3], {(1,3):2, (2,3):3})
+        self.assertEqual(self.N.outs[0], {(0,1):1, (0,2):1})
+        self.assertEqual(self.N.ins[0], {})
+
+    def testFire(self):
+        self.assertEqual(self.fire_all([5, 7]), [5, 7])
+        self.assertRaises(Exception, self.N.fire, 0)
+
+    def testEdgeUpdates(self):
+        self.N.set_weight((0,2), 2)
+        self.assertEqual(self.fire_all([5, 7]), [5, 14])
+        self.N.add_edge((1,2), 1)
+        self.assertEqual(self.N.ins[2], {(0,2):2, (1,2):1})
+        self.assertEqual(self.fire_all([5, 7]), [5, 19])
+        self.N.remove_edge((1,2))
+        self.assertEqual(self.N.ins[2], {(0,2):2})
+        self.assertNotIn((1,2), self.N.E)
+
+    def testActivate(self):
+        self.assertEqual(self.N.activate([5, 7]), [5, 7])
+        schedule = self.N.compile()
+        self.assertIs(self.N.compile(), schedule)
+        self.N.set_weight((0,2), 2)
+        self.assertIsNot(self.N.compile(), schedule)
+        self.assertEqual(self.N.activate([5, 7]), [5, 14])
+        self.N.weights = dict(self.weights)
+        self.assertEqual(self.N.activate([5, 7]), [5, 7])
+
+    def testSetFunc(self):
+        self.assertEqual(self.N.activate([-5, 7]), [-5, 7])
+        self.N.func = 'relu'
+        self.assertEqual(self.N.activate([-5, 7]), [0, 7])
+
+    def testActivateRejectsCycles(self):
+        self.N.add_edge((1,2), 1)
+        self.N.add_edge((2,1), 1)
+        self.assertRaises(ValueError, self.N.activate, [5, 7])
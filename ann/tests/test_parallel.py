@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from ann.ann import ANN
+from ann.network import Perceptron
+from ann.parallel import ParallelFeedforward, train_parallel
+
+class TestParallelFeedforward(unittest.TestCase):
+    def setUp(self):
+        # Two sources, a hidden level of three and a hidden level of two
+        # vertices, each feeding one sink.
+        N = None
+        self.G=ANN([[N, N,   1, 0.5,  -1, N, N, N, N],
+                    [N, N,   2,   N,   1, N, N, N, N],
+                    [N, N,   N,   N,   N, 1, 2, N, N],
+                    [N, N,   N,   N,   N, 3, N, N, N],
+                    [N, N,   N,   N,   N, 1, 1, N, N],
+                    [N, N,   N,   N,   N, N, N, 2, N],
+                    [N, N,   N,   N,   N, N, N, N, 1],
+                    [N, N,   N,   N,   N, N, N, N, N],
+                    [N, N,   N,   N,   N, N, N, N, N]], 'relu')
+        self.X = np.random.RandomState(0).uniform(-1, 1, (10, 2))
+        self.expected = self.G.feedforward_batch(self.X)
+
+    def testThreads(self):
+        with ThreadPoolExecutor(2) as executor:
+            pf = ParallelFeedforward(self.G, executor, parts=2, chunk_size=3)
+            np.testing.assert_allclose(pf.feedforward_batch(self.X),
+                                       self.expected)
+            self.assertEqual(pf.feedforward(self.X[0]),
+                             self.G.feedforward(self.X[0]))
+
+    def testProcesses(self):
+        with ProcessPoolExecutor(2) as executor, \
+             ParallelFeedforward(self.G, executor, parts=2, chunk_size=3) as pf:
+            np.testing.assert_allclose(pf.feedforward_batch(self.X),
+                                       self.expected)
+
+class TestTrainParallel(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        X = rng.uniform(-1, 1, (200, 3))
+        self.Xtr = np.column_stack([X, X @ [1, -2, 0.5] > 0.1]).astype(float)
+
+    def testSingleShardMatchesTrainBatch(self):
+        p = Perceptron(3)
+        trained = train_parallel(p, self.Xtr, epochs=5, batch_size=10,
+                                 processes=1)
+        p.train_batch(self.Xtr, epochs=5, batch_size=10)
+        np.testing.assert_allclose(trained.weights, p.weights)
+
+    def testShardsFromFile(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'Xtr.npy')
+        np.save(path, self.Xtr)
+        try:
+            trained = train_parallel(Perceptron(3), path, epochs=200,
+                                     batch_size=1, processes=2)
+        finally:
+            shutil.rmtree(directory)
+        self.assertIsInstance(trained, Perceptron)
+        self.assertGreater(trained.accuracy(self.Xtr), 0.95)
@@ -0,0 +1,76 @@
+import unittest
+import numpy as np
+from ann.ann import ANN
+from ann.graph import Graph
+from ann.prune import prune
+
+class TestPrune(unittest.TestCase):
+    def setUp(self):
+        # Vertex 2 only feeds 4 through a small weight, and 3 a larger one.
+        self.matrix = [[None,None, 0.01,   1,None,None],
+                       [None,None,    1,   2,None,None],
+                       [None,None, None,None, 0.05,None],
+                       [None,None, None,None,    1,None],
+                       [None,None, None,None, None, 0.5],
+                       [None,None, None,None, None,None]]
+        self.G = ANN(self.matrix, 'tanh')
+        self.X = np.linspace(-1, 1, 12).reshape(6, 2)
+
+    def testNoPruning(self):
+        pruned, report = prune(self.G, X=self.X)
+        self.assertEqual(pruned.matrix, self.matrix)
+        self.assertEqual((report.edges_removed, report.vertices_removed), (0, 0))
+        self.assertEqual(report.max_error, 0)
+
+    def testThreshold(self):
+        pruned, report = prune(self.G, threshold=0.1, X=self.X)
+        self.assertIsInstance(pruned, ANN)
+        self.assertEqual(pruned.func, 'tanh')
+        # 0->2 and 2->4 are dropped, which leaves 2 dead and 1->2 removed.
+        self.assertEqual(report.edges_removed, 3)
+        self.assertEqual(report.vertices_removed, 1)
+        self.assertEqual(report.vertices.tolist(), [0, 1, 3, 4, 5])
+        self.assertEqual(pruned.matrix, [[None,None,   1,None,None],
+                                         [None,None,   2,None,None],
+                                         [None,None,None,   1,None],
+                                         [None,None,None,None, 0.5],
+                                         [None,None,None,None,None]])
+        self.assertGreater(report.max_error, 0)
+        self.assertLess(report.max_error, 0.05)
+        self.assertLessEqual(report.mean_error, report.max_error)
+
+    def testTopK(self):
+        G = ANN([[None,None,None,   1, 0.1,None,None],
+                 [None,None,None, 0.5, 0.2,None,None],
+                 [None,None,None, 0.1,   1,None,None],
+                 [None,None,None,None,None,   1,None],
+                 [None,None,None,None,None,   1,None],
+                 [None,None,None,None,None,None,   2],
+                 [None,None,None,None,None,None,None]], 'tanh')
+        pruned, report = prune(G, top_k=2)
+        self.assertEqual((report.edges_removed, report.vertices_removed), (2, 0))
+        self.assertEqual(pruned.heads(3), [0, 1])
+        self.assertEqual(pruned.heads(4), [1, 2])
+        self.assertEqual(pruned.sources(), G.sources())
+        self.assertEqual(pruned.sinks(), G.sinks())
+        # A budget of one edge per vertex cuts source 1 off.
+        self.assertRaises(ValueError, prune, G, top_k=1)
+
+    def testKeepsSinkEdges(self):
+        # 4->5 is below the threshold, but feeds the sink.
+        pruned, report = prune(self.G, threshold=0.75)
+        self.assertEqual(report.vertices.tolist(), [0, 1, 3, 4, 5])
+        self.assertEqual(pruned.cost(3, 4), 0.5)
+
+    def testDisconnectedSource(self):
+        self.assertRaises(ValueError, prune, self.G, threshold=3)
+
+    def testGraphBackend(self):
+        G = Graph(self.matrix, backend='dense')
+        pruned, report = prune(G, threshold=0.1)
+        self.assertEqual(type(pruned), Graph)
+        self.assertEqual(pruned.backend, 'dense')
+        self.assertIsNone(report.max_error)
+
+if __name__ == '__main__':
+    unittest.main()
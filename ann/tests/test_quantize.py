@@ -0,0 +1,110 @@
+import unittest
+import numpy as np
+from ann.ann import ANN
+from ann.network import Perceptron
+from ann.quantize import (QuantizedANN, QuantizedPerceptron, accuracy_drift,
+                          output_drift, quantize, quantize_weights)
+
+class TestQuantizeWeights(unittest.TestCase):
+    def testInt8(self):
+        q, scale = quantize_weights([0.5, -1.27, 0], 'int8')
+        self.assertEqual(q.dtype, np.int8)
+        self.assertEqual(q.tolist(), [50, -127, 0])
+        self.assertAlmostEqual(scale, 0.01)
+
+    def testZero(self):
+        q, scale = quantize_weights([0, 0], 'int8')
+        self.assertEqual(q.tolist(), [0, 0])
+        self.assertEqual(scale, 1.0)
+
+    def testFloat32(self):
+        q, scale = quantize_weights([0.5, 2], 'float32')
+        self.assertEqual(q.dtype, np.float32)
+        self.assertEqual(scale, 1.0)
+
+class TestQuantizedPerceptron(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        X = rng.uniform(-1, 1, (500, 4))
+        self.Xtr = np.column_stack([X, X @ [1, -2, 0.5, 0.25] > 0.1])
+        self.p = Perceptron(4, [-0.1, 1, -2, 0.5, 0.25])
+
+    def testPredict(self):
+        for dtype in ('float64', 'float32', 'int8'):
+            q = quantize(self.p, dtype)
+            self.assertIsInstance(q, QuantizedPerceptron)
+            np.testing.assert_array_equal(q.predict(self.Xtr[:10, :-1]),
+                                          self.p.predict(self.Xtr[:10, :-1]))
+
+    def testAccuracyDrift(self):
+        report = accuracy_drift(self.p, self.Xtr, chunk_size=64)
+        self.assertEqual([r.dtype for r in report], ['float64', 'float32', 'int8'])
+        self.assertEqual([r.weight_bytes for r in report], [40, 20, 5])
+        self.assertEqual(report[0].drift, 0)
+        for r in report:
+            self.assertLessEqual(abs(r.drift), 0.02)
+
+class TestFloat64(unittest.TestCase):
+    """
+    The float64 mode must match the reference exactly, which weights not
+    representable in float32 would show.
+    """
+    def setUp(self):
+        self.rng = np.random.RandomState(1)
+
+    def testPerceptron(self):
+        p = Perceptron(5, self.rng.randn(6), 'identity')
+        X = self.rng.randn(50, 5)
+        q = quantize(p, 'float64')
+        self.assertEqual(q.nbytes, 48)
+        np.testing.assert_array_equal(q.predict(X), p.predict(X))
+        Xtr = np.column_stack([X, X @ self.rng.randn(5) > 0])
+        p.func = 'heaviside'
+        report = accuracy_drift(p, Xtr, dtypes=('float64',))
+        self.assertEqual(report[0].drift, 0)
+
+    def testANN(self):
+        w = self.rng.randn(5)
+        G = ANN([[None,None,w[0],w[1],None,None],
+                 [None,None,w[2],w[3],None,None],
+                 [None,None,None,None,w[4],None],
+                 [None,None,None,None,None,   1],
+                 [None,None,None,None,None,None],
+                 [None,None,None,None,None,None]], 'tanh')
+        report = output_drift(G, self.rng.randn(20, 2), dtypes=('float64',))
+        self.assertEqual(report[0].weight_bytes,
+                         8*sum(w.size for _, _, w, _ in G.batch_plan()))
+        self.assertLess(report[0].max_error, 1e-15)
+
+
+class TestQuantizedANN(unittest.TestCase):
+    def setUp(self):
+        self.G = ANN([[None,   1,   1,None,None,None,None],
+                      [None,None,None,   1,   1,None,None],
+                      [None,None,None,   2,   1,None,None],
+                      [None,None,None,None,None,   1,None],
+                      [None,None,None,None,None,   1,None],
+                      [None,None,None,None,None,None, 0.5],
+                      [None,None,None,None,None,None,None]], 'tanh')
+        self.X = np.linspace(-1, 1, 11)[:, None]
+
+    def testFeedforwardBatch(self):
+        expected = self.G.feedforward_batch(self.X)
+        for dtype, tol in (('float64', 1e-12), ('float32', 1e-6), ('int8', 2e-2)):
+            q = quantize(self.G, dtype)
+            self.assertIsInstance(q, QuantizedANN)
+            out = q.feedforward_batch(self.X, chunk_size=4)
+            self.assertEqual(out.shape, expected.shape)
+            np.testing.assert_allclose(out, expected, atol=tol)
+
+    def testOutputDrift(self):
+        report = output_drift(self.G, self.X, ('float32', 'int8'))
+        self.assertEqual(report[0].weight_bytes, 4*report[1].weight_bytes)
+        self.assertLess(report[0].max_error, report[1].max_error)
+        self.assertLess(report[1].max_error, 2e-2)
+
+    def testUnsupported(self):
+        self.assertRaises(TypeError, quantize, object())
+
+if __name__ == '__main__':
+    unittest.main()
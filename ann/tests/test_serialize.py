@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from ann.ann import ANN
+from ann.graph import Graph
+from ann.network import Perceptron
+from ann.serialize import load, save
+
+class TestSerialize(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'model.bin')
+        self.matrix = [[None,   1,   1,None,None,None,None],
+                       [None,None,None,   1,   1,None,None],
+                       [None,None,None,   2,   1,None,None],
+                       [None,None,None,None,None,   1,None],
+                       [None,None,None,None,None,   1,None],
+                       [None,None,None,None,None,None, 0.5],
+                       [None,None,None,None,None,None,None]]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testGraph(self):
+        save(Graph(self.matrix), self.path)
+        G = load(self.path)
+        self.assertEqual(type(G), Graph)
+        self.assertIsInstance(G.index().tails.data, np.memmap)
+        self.assertEqual(G.matrix, self.matrix)
+        self.assertEqual(G.heads(3), [1, 2])
+
+    def testANN(self):
+        G = ANN(self.matrix, 'tanh')
+        save(G, self.path)
+        for mmap in (True, False):
+            loaded = load(self.path, mmap)
+            self.assertEqual(type(loaded), ANN)
+            self.assertEqual(loaded.feedforward((0.5,)), G.feedforward((0.5,)))
+        loaded.set_cost(5, 6, 1)
+        self.assertEqual(load(self.path).cost(5, 6), 0.5)
+
+    def testPerceptron(self):
+        p = Perceptron(3, [0.5, -1, 2, 0.25], 'sigmoid')
+        save(p, self.path)
+        loaded = load(self.path)
+        self.assertIsInstance(loaded.weights, np.memmap)
+        self.assertEqual(loaded.ni, 3)
+        self.assertEqual(loaded.activate([1, 2, 3]), p.activate([1, 2, 3]))
+
+    def testUnregisteredActivation(self):
+        self.assertRaises(ValueError, save, ANN(self.matrix, max), self.path)
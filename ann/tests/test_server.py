@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from ann.ann import ANN
+from ann.network import Perceptron
+from ann.server import Client, InferenceServer, load_test
+
+class TestInferenceServer(unittest.TestCase):
+    def setUp(self):
+        self.G=ANN([[None,   1,None,None,None],
+                    [None,None,None,None,None],
+                    [ 0.3,None,None,None,None],
+                    [ 0.5,None,None,None,None],
+                    [   1,None,None,None,None]], 'tanh')
+        self.inputs = np.random.RandomState(0).uniform(-1, 1, (20, 3)).tolist()
+
+    def testMicroBatching(self):
+        async def run():
+            async with InferenceServer(self.G, max_batch_size=8) as server:
+                outputs = await asyncio.gather(
+                    *[server.submit(i) for i in self.inputs])
+            return server, outputs
+        server, outputs = asyncio.run(run())
+        for i, o in zip(self.inputs, outputs):
+            self.assertAlmostEqual(o[1], self.G.feedforward(i)[1])
+        self.assertEqual(server.requests, len(self.inputs))
+        self.assertLess(server.batches, len(self.inputs))
+
+    def testLoopback(self):
+        p = Perceptron(3, [0.1, 1, -1, 0.5])
+        async def run():
+            server = InferenceServer(p, max_batch_size=4)
+            listener = await server.serve()
+            host, port = listener.sockets[0].getsockname()[:2]
+            async with listener:
+                client = await Client().connect(host, port)
+                output = await client.predict(self.inputs[0])
+                await client.close()
+                result = await load_test(host, port, self.inputs,
+                                         requests=50, concurrency=5)
+            await server.stop()
+            return output, result
+        output, result = asyncio.run(run())
+        self.assertEqual(output, {0: p.activate(self.inputs[0])})
+        self.assertEqual(result['requests'], 50)
+        self.assertLessEqual(result['p50'], result['p99'])
+        self.assertGreater(result['throughput'], 0)
+
+    def testErrors(self):
+        async def run():
+            async with InferenceServer(self.G) as server:
+                await server.submit([1, 2])
+        self.assertRaises(ValueError, asyncio.run, run())
+
+    def testMalformedRequestInBatch(self):
+        async def run():
+            async with InferenceServer(self.G, max_batch_size=8) as server:
+                return await asyncio.gather(
+                    server.submit(self.inputs[0]), server.submit([1, 2]),
+                    server.submit(['a', 1, 2]), server.submit(self.inputs[1]),
+                    return_exceptions=True)
+        outputs = asyncio.run(run())
+        self.assertIsInstance(outputs[1], ValueError)
+        self.assertIsInstance(outputs[2], ValueError)
+        for i, o in zip(self.inputs[:2], [outputs[0], outputs[3]]):
+            self.assertAlmostEqual(o[1], self.G.feedforward(i)[1])
+
+    def testStopCancelsBatchBeingScored(self):
+        scoring = threading.Event()
+        release = threading.Event()
+        class SlowServer(InferenceServer):
+            def _score(self, X):
+                scoring.set()
+                release.wait(5)
+                return super()._score(X)
+        async def run():
+            server = SlowServer(self.G, max_wait=0)
+            await server.start()
+            request = asyncio.ensure_future(server.submit(self.inputs[0]))
+            await asyncio.get_running_loop().run_in_executor(None, scoring.wait, 5)
+            await server.stop()
+            await asyncio.wait({request}, timeout=1)
+            release.set()
+            return request.cancelled()
+        self.assertTrue(asyncio.run(run()))
+
+    def testStopAndRestart(self):
+        async def run():
+            server = InferenceServer(self.G)
+            await server.stop()
+            outputs = []
+            for _ in range(2):
+                await server.start()
+                executor = server.executor
+                outputs.append(await server.submit(self.inputs[0]))
+                await server.stop()
+                self.assertIsNone(server.executor)
+                self.assertRaises(RuntimeError, executor.submit, int)
+            await server.stop()
+            return outputs
+        outputs = asyncio.run(run())
+        self.assertEqual(outputs[0], outputs[1])
+
+    def testGivenExecutorIsNotShutDown(self):
+        executor = ThreadPoolExecutor(1)
+        async def run():
+            async with InferenceServer(self.G, executor=executor) as server:
+                await server.submit(self.inputs[0])
+        asyncio.run(run())
+        self.assertEqual(executor.submit(int).result(), 0)
+        executor.shutdown()
@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+from ann.ann import ANN
+from ann.network import Perceptron
+from ann.stats import Stats
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        self.G=ANN([[None,   1,   1,None,None,None,None],
+                    [None,None,None,   1,   1,None,None],
+                    [None,None,None,   1,   1,None,None],
+                    [None,None,None,None,None,   1,None],
+                    [None,None,None,None,None,   1,None],
+                    [None,None,None,None,None,None,   1],
+                    [None,None,None,None,None,None,None]], sum)
+
+    def testDisabledByDefault(self):
+        self.assertIsNone(self.G.stats)
+        self.G.feedforward((1,))
+
+    def testFeedforward(self):
+        stats = self.G.stats = Stats()
+        self.G.feedforward((1,))
+        self.G.feedforward((2,))
+        self.G.feedforward_batch(np.ones((5, 1)))
+        self.assertEqual(stats.samples, 7)
+        self.assertEqual(stats.vertex_evaluations, 7*6)
+        self.assertEqual(stats.edge_multiplications, 7*9)
+        self.assertGreater(stats.cache_hits, 0)
+        self.assertGreater(stats.cache_misses, 0)
+        self.assertEqual(stats.heads_calls, 0)
+        self.assertIn('feedforward.propagate', stats.phases)
+        self.assertIn('feedforward_batch.plan', stats.phases)
+        self.G.heads(3)
+        self.G.tails(3)
+        self.assertEqual((stats.heads_calls, stats.tails_calls), (1, 1))
+        stats.reset()
+        self.assertEqual(stats.as_dict()['samples'], 0)
+
+    def testPerceptronEpochs(self):
+        Xtr = np.array([[0, 0, 0], [0, 1, 0], [1, 0, 0], [1, 1, 1]], dtype=float)
+        p = Perceptron(2)
+        p.stats = Stats()
+        report = p.train_batch(Xtr, epochs=50, batch_size=1)
+        self.assertEqual(len(p.stats.epochs), report.epochs)
+        self.assertEqual(p.stats.samples, 4*report.epochs)
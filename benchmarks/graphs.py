@@ -0,0 +1,66 @@
+"""
+Synthetic network generators for the benchmarks.
+"""
+import random
+
+def layered_matrix(widths, density=1.0, seed=0):
+    """
+    Return the nested list matrix of a layered DAG. widths gives the number of
+    vertices in each layer, starting with the sources. Each vertex is joined
+    to each vertex of the next layer with probability density (and to at
+    least one), with weights drawn uniformly from [-1, 1]. Every vertex of
+    the last layer then feeds a sink of its own, since ANN sinks have one
+    head.
+    """
+    rng = random.Random(seed)
+    n = sum(widths) + widths[-1]
+    matrix = [[None]*n for _ in range(n)]
+    start = 0
+    for width, following in zip(widths, widths[1:] + [None]):
+        layer = range(start, start + width)
+        start += width
+        if following is None:
+            for i, V in enumerate(layer):
+                matrix[V][start + i] = 1.0
+            break
+        for v in range(start, start + following):
+            heads = [V for V in layer if rng.random() < density]
+            for V in heads or [rng.choice(layer)]:
+                matrix[V][v] = rng.uniform(-1, 1)
+    return matrix
+
+def random_dag_matrix(n, density=0.1, seed=0):
+    """
+    Return the nested list matrix of a random DAG on n vertices, where each
+    pair i < j is joined by an edge i -> j with probability density and a
+    weight drawn uniformly from [-1, 1]. Since ANN sinks have one head, every
+    vertex left with no tails but some heads then feeds a sink of its own.
+    """
+    rng = random.Random(seed)
+    edges = [(i, j, rng.uniform(-1, 1)) for i in range(n)
+             for j in range(i + 1, n) if rng.random() < density]
+    has_heads = {j for _, j, _ in edges}
+    has_tails = {i for i, _, _ in edges}
+    ends = [V for V in range(n) if V in has_heads and V not in has_tails]
+    edges += [(V, n + k, 1.0) for k, V in enumerate(ends)]
+    n += len(ends)
+    matrix = [[None]*n for _ in range(n)]
+    for i, j, c in edges:
+        matrix[i][j] = c
+    return matrix
+
+def network(widths, density=1.0, seed=0):
+    """
+    Return (V, E, weights) for a Network whose hidden layers are the layered
+    DAG of layered_matrix(widths, density, seed), fed by a source vertex
+    joined to every vertex of the first layer and feeding a sink vertex
+    joined from every vertex of the last.
+    """
+    matrix = layered_matrix(widths, density, seed)
+    n = len(matrix)
+    # Shift the matrix's vertices up by one to make room for the source.
+    weights = {(i + 1, j + 1): c for i, row in enumerate(matrix)
+               for j, c in enumerate(row) if c is not None}
+    weights.update({(0, V + 1): 1.0 for V in range(widths[0])})
+    weights.update({(V + 1, n + 1): 1.0 for V in range(n - widths[-1], n)})
+    return list(range(n + 2)), list(weights), weights
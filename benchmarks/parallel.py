@@ -0,0 +1,59 @@
+"""
+Time level-parallel feedforward against ANN.feedforward_batch on a wide
+layered network, for increasing numbers of workers.
+
+    python -m benchmarks.parallel --width 512 --depth 4 --samples 20000
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from ann.ann import ANN
+from ann.parallel import ParallelFeedforward
+from benchmarks.graphs import layered_matrix
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--inputs', type=int, default=64)
+    parser.add_argument('--width', type=int, default=512)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--density', type=float, default=1.0)
+    parser.add_argument('--samples', type=int, default=20000)
+    parser.add_argument('--chunk-size', type=int, default=4096)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    G = ANN(layered_matrix([args.inputs] + [args.width]*args.depth,
+                           args.density), 'tanh')
+    X = np.random.RandomState(0).uniform(-1, 1, (args.samples, args.inputs))
+    expected = G.feedforward_batch(X, args.chunk_size)
+    serial = best_of(lambda: G.feedforward_batch(X, args.chunk_size),
+                     args.repeat)
+    print("{:<10}{:>8}{:>10}{:>9}".format("mode", "workers", "seconds", "speedup"))
+    print("{:<10}{:>8}{:>10.3f}{:>9.2f}".format("serial", 1, serial, 1))
+
+    workers = [1]
+    while workers[-1]*2 <= os.cpu_count():
+        workers.append(workers[-1]*2)
+    for mode, pool in [("threads", ThreadPoolExecutor),
+                       ("processes", ProcessPoolExecutor)]:
+        for n in workers:
+            with pool(n) as executor, ParallelFeedforward(
+                    G, executor, parts=n, chunk_size=args.chunk_size) as pf:
+                assert(np.allclose(pf.feedforward_batch(X), expected))
+                t = best_of(lambda: pf.feedforward_batch(X), args.repeat)
+            print("{:<10}{:>8}{:>10.3f}{:>9.2f}".format(mode, n, t, serial/t))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Benchmark the hot paths of Graph, ANN, Perceptron and Network on synthetic
+networks, and compare the results with a stored baseline.
+
+    python -m benchmarks.suite                  # run and compare
+    python -m benchmarks.suite --save           # run and store as baseline
+    python -m benchmarks.suite --size large --tolerance 0.5
+
+Each case is timed as the best of --repeat runs and reports its throughput
+(items per second) and, from a separate run under tracemalloc, its peak
+traced memory. A case more than --tolerance slower than the baseline, or
+using more than --tolerance more memory, is reported as a regression and
+makes the suite exit with status 1, as does a missing baseline unless --save
+is given. Baselines are only comparable on the machine that recorded them.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from ann.ann import ANN
+from ann.graph import Graph
+from ann.network import Network, Perceptron
+from benchmarks.graphs import layered_matrix, network, random_dag_matrix
+
+SIZES = {
+    'small': {'width': 64, 'layers': 3, 'vertices': 200, 'samples': 2000,
+              'rows': 20000},
+    'medium': {'width': 256, 'layers': 4, 'vertices': 1000, 'samples': 20000,
+               'rows': 200000},
+    'large': {'width': 1024, 'layers': 4, 'vertices': 4000, 'samples': 100000,
+              'rows': 2000000},
+}
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+def cases(size, density, seed):
+    """
+    Return a list of (name, items, setup) triples, where setup builds the
+    inputs of a case and returns a function running it once over items
+    items.
+    """
+    p = SIZES[size]
+    samples = p['samples']
+    widths = [p['width']]*p['layers']
+    rng = np.random.RandomState(seed)
+    X = rng.uniform(-1, 1, (p['samples'], p['width']))
+    rows = rng.uniform(-1, 1, (p['rows'], 16))
+    Xtr = np.column_stack([rows, rows @ rng.uniform(-1, 1, 16) > 0])
+
+    def graph_index(matrix):
+        def setup():
+            G = Graph(matrix)
+            def run():
+                # Replacing the matrix clears the cached index.
+                G.matrix = matrix
+                G.index()
+            return run
+        return setup
+
+    def graph_queries(matrix):
+        def setup():
+            G = Graph(matrix)
+            G.index()
+            def run():
+                for V in range(G.order()):
+                    G.heads(V)
+                    G.tails(V)
+                G.sources()
+                G.sinks()
+            return run
+        return setup
+
+    def ann(matrix, method):
+        def setup():
+            G = ANN(matrix, 'tanh')
+            inputs = X[:, :len(G.sources())]
+            if method == 'single':
+                G.plan()
+                return lambda: [G.feedforward(row) for row in inputs[:100]]
+            if method == 'engine':
+                return lambda: G.engine().feedforward_batch(inputs)
+            G.batch_plan()
+            return lambda: G.feedforward_batch(inputs)
+        return setup
+
+    def perceptron(method):
+        def setup():
+            p = Perceptron(16, func='heaviside')
+            if method == 'train':
+                return lambda: p.train(Xtr, iterations=samples)
+            if method == 'train_batch':
+                return lambda: p.train_batch(Xtr, epochs=1, batch_size=1024)
+            p.weights = rng.uniform(-1, 1, 17)
+            return lambda: p.accuracy(Xtr)
+        return setup
+
+    def network_fire():
+        V, E, weights = network(widths, density, seed)
+        N = Network(V, E, weights, 'tanh')
+        order = [v for v in N.V if N.ins[v] and N.outs[v]]
+        N.activate([0.5]*widths[0])
+        def run():
+            for v in order:
+                N.fire(v)
+        return run
+
+    layered = layered_matrix(widths, density, seed)
+    dense = layered_matrix(widths, 1.0, seed)
+    dag = random_dag_matrix(p['vertices'], min(1.0, 10/p['vertices']), seed)
+    edges = sum(c is not None for row in layered for c in row)
+    return [
+        ('graph.index/layered', len(layered), graph_index(layered)),
+        ('graph.index/random', len(dag), graph_index(dag)),
+        ('graph.queries/layered', len(layered), graph_queries(layered)),
+        ('graph.queries/random', len(dag), graph_queries(dag)),
+        ('ann.feedforward/single', 100, ann(layered, 'single')),
+        ('ann.feedforward/batch', len(X), ann(layered, 'batch')),
+        ('ann.feedforward/engine', len(X), ann(layered, 'engine')),
+        ('ann.feedforward/fused', len(X), ann(dense, 'batch')),
+        ('ann.feedforward/random-batch', len(X), ann(dag, 'batch')),
+        ('perceptron.train', samples, perceptron('train')),
+        ('perceptron.train_batch', len(Xtr), perceptron('train_batch')),
+        ('perceptron.accuracy', len(Xtr), perceptron('accuracy')),
+        ('network.fire', edges, network_fire),
+    ]
+
+def measure(setup, items, repeat):
+    tracemalloc.start()
+    run = setup()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    run = setup()
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        seconds = min(seconds, time.perf_counter() - start)
+    return {'seconds': seconds, 'throughput': items/seconds, 'peak_bytes': peak}
+
+def compare(results, baseline, tolerance):
+    """
+    Return a list of messages describing the regressions of results against
+    baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        if result['seconds'] > base['seconds']*(1 + tolerance):
+            regressions.append("{}: {:.4f}s vs baseline {:.4f}s".format(
+                name, result['seconds'], base['seconds']))
+        if result['peak_bytes'] > base['peak_bytes']*(1 + tolerance):
+            regressions.append("{}: peak {} bytes vs baseline {} bytes".format(
+                name, result['peak_bytes'], base['peak_bytes']))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--density', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true',
+                        help="store the results as the baseline")
+    parser.add_argument('--filter', default='',
+                        help="only run cases whose name contains this")
+    args = parser.parse_args(argv)
+
+    key = '{}/density={}/seed={}'.format(args.size, args.density, args.seed)
+    results = {}
+    print("{:<32}{:>12}{:>16}{:>14}".format("case", "seconds", "items/s", "peak KiB"))
+    for name, items, setup in cases(args.size, args.density, args.seed):
+        if args.filter not in name:
+            continue
+        results[name] = result = measure(setup, items, args.repeat)
+        print("{:<32}{:>12.4f}{:>16.1f}{:>14}".format(
+            name, result['seconds'], result['throughput'],
+            result['peak_bytes']//1024))
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+    if args.save:
+        stored.setdefault(key, {}).update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+        print("Saved baseline {} to {}".format(key, args.baseline))
+        return 0
+    if key not in stored:
+        print("No baseline {} in {}; record one with --save.".format(
+            key, args.baseline))
+        return 1
+    regressions = compare(results, stored[key], args.tolerance)
+    if regressions:
+        print("\nREGRESSIONS against baseline {}:".format(key))
+        for message in regressions:
+            print("  " + message)
+        return 1
+    print("\nNo regressions against baseline {}.".format(key))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,7 +3,7 @@ try:
 except InputError:
     from distutils.core import setup
 
-requirements = ['green', 'nose', 'nose_parameterized']
+requirements = ['green', 'nose', 'nose_parameterized', 'numpy']
 
 config = {
     'description' : 'Package providing classes for machine learning data structures and algorithms',